@@ -1,30 +1,137 @@
 import os
-import shutil
-import struct
 import sys
+import shutil
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# The padding comes from the padder of the reference model.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "..", "..", "model"))
+from sha256_padder import padded_blocks, padding_tail
+
+CHUNK_SIZE = 1 << 20
+
+# Padding of a message of size bytes: the 0x80 byte, zeroes up to
+# 8 bytes before the end of a 64 byte block and the 64-bit
+# (8 byte) length in bits.
+def padding(size):
+    return bytes(padding_tail(size, bytes(size % 64)))[size % 64:]
+
+# Write <file>.padded, a padded copy of the file.
+def pad_copy(filename):
+    out_filename = filename+".padded"
+    shutil.copyfile(filename, out_filename)
+    with open(out_filename, 'ab') as f:
+        f.write(padding(os.path.getsize(filename)))
+
+# Write only <file>.tail, the last partial block of the file
+# followed by the padding. The testbench reads the complete
+# blocks of the file and then the tail (+tail=<file>.tail).
+def pad_virtual(filename):
+    size = os.path.getsize(filename)
+    with open(filename, 'rb') as f:
+        f.seek(size - (size % 64))
+        rest = f.read()
+    with open(filename+".tail", 'wb') as f:
+        f.write(padding_tail(size, rest))
+
+# Append the padding to the file itself.
+def pad_in_place(filename):
+    with open(filename, 'ab') as f:
+        f.seek(0, os.SEEK_END)
+        f.write(padding(f.tell()))
+
+# Copy stdin to stdout in fixed size chunks and append the padding.
+def pad_pipe():
+    size = 0
+    while True:
+        chunk = sys.stdin.buffer.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        sys.stdout.buffer.write(chunk)
+    sys.stdout.buffer.write(padding(size))
+    sys.stdout.buffer.flush()
+
+# Pad a file and compute the digest of the unpadded file in one
+# read. Writes <file>.padded, or <file>.tail if virtual is set.
+# Returns the manifest entry (file, size, blocks, digest).
+def pad_and_digest(filename, mode="sha256", virtual=False):
+    h = hashlib.new(mode)
+    size = 0
+    last = b""
+    out_filename = filename + (".tail" if virtual else ".padded")
+    with open(filename, 'rb') as f, open(out_filename, 'wb') as out:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            h.update(chunk)
+            if virtual:
+                last = (last + chunk[-64:])[-64:]
+            else:
+                out.write(chunk)
+        rest = last[len(last) - (size % 64):] if size % 64 else b""
+        out.write(padding_tail(size, rest))
+    blocks = padded_blocks(size)
+    return (filename, size, blocks, int(h.hexdigest(), 16))
+
+# Pad many files concurrently and write the manifest. The digest
+# is written as a decimal integer, as the +expected_sha plusarg
+# of tb_sha256_stream expects it.
+def pad_batch(filenames, manifest, mode="sha256", virtual=False, jobs=None,
+              processes=False):
+    executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor_class(max_workers=jobs) as executor:
+        entries = list(executor.map(pad_and_digest, filenames,
+                                    [mode] * len(filenames),
+                                    [virtual] * len(filenames)))
+    out = open(manifest, 'w') if manifest != "-" else sys.stdout
+    out.write("# file size blocks %s\n" % mode)
+    for entry in entries:
+        out.write("%s %d %d %d\n" % entry)
+    if out is not sys.stdout:
+        out.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Pad files for the SHA-256 "
+                                     "stream testbench.")
+    parser.add_argument("files", nargs="*", default=["-"],
+                        help="files to pad, - or none to pad stdin to stdout")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--virtual", action="store_true",
+                       help="write only the padding tail to <file>.tail")
+    group.add_argument("--in-place", action="store_true",
+                       help="append the padding to the file itself")
+    parser.add_argument("--batch", action="store_true",
+                        help="pad all files concurrently and write a manifest")
+    parser.add_argument("--manifest", default="-",
+                        help="manifest file for --batch (default stdout)")
+    parser.add_argument("--mode", choices=["sha224", "sha256"],
+                        default="sha256", help="digest in the manifest")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="number of workers for --batch")
+    parser.add_argument("--processes", action="store_true",
+                        help="use worker processes instead of threads")
+    args = parser.parse_args()
 
-out_filename = sys.argv[1]+".padded"
-shutil.copyfile(sys.argv[1], out_filename)
-with open(out_filename,'ab') as f:
-    f.seek(0, os.SEEK_END)
-    size = f.tell()
-    print(size)
-    #Add padding word to end of file
-    f.write(bytearray([0x80]))
-
-    #Calculate number of padding zeroes
-    # = File size rounded up to next 512-byte block
-    # minues space for padding start byte (0x80)
-    # and 64-bit (8 byte) length word
-    zeroes = 64 - (size % 64) - 1 - 8
-    if zeroes < 0:
-        zeroes += 64
-    
-    print(zeroes)
-    f.write(bytearray([0]*zeroes))
-    #sizeword = (size % 64)*8
-    #if sizeword == 0:
-    #    sizeword = 64*8
-    sizeword = size*8
-    f.write(struct.pack('>Q', sizeword))
+    if args.batch:
+        if args.in_place or ("-" in args.files):
+            parser.error("--batch needs files and does not pad in place")
+        pad_batch(args.files, args.manifest, args.mode, args.virtual,
+                  args.jobs, args.processes)
+    elif len(args.files) > 1:
+        parser.error("more than one file needs --batch")
+    elif args.files[0] == "-":
+        pad_pipe()
+    elif args.virtual:
+        pad_virtual(args.files[0])
+    elif args.in_place:
+        pad_in_place(args.files[0])
+    else:
+        pad_copy(args.files[0])
 
+if __name__ == "__main__":
+    main()
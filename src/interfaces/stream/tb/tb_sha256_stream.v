@@ -100,11 +100,43 @@ module tb_sha256_stream();
    always @(posedge digest_valid)
      digested_blocks = digested_blocks + 1;
 
+   // Chaining value check (+chain=<file>.chain from sha256_chain.py).
+   // Each record is the number of digested blocks and the expected
+   // digest after that block. The simulation stops at the first
+   // block where digest_o differs.
+   reg [1024*8-1:0] chainname = "";
+   reg [287:0] 	    chain_record;
+   integer 	    chain_f = 0;
+   integer 	    chain_c = 0;
+
+   initial
+     if ($value$plusargs("chain=%s", chainname)) begin
+	chain_f = $fopen(chainname, "rb");
+	chain_c = $fread(chain_record, chain_f);
+     end
+
+   always @(posedge digest_valid) begin
+      @(negedge clk);
+      if (chain_c && (chain_record[287:256] == digested_blocks)) begin
+	 if (digest !== chain_record[255:0]) begin
+	    $display("Chaining value mismatch after block %0d (bytes %0d to %0d)",
+		     digested_blocks - 1, (digested_blocks - 1) * 64,
+		     digested_blocks * 64 - 1);
+	    $display("Expected %h", chain_record[255:0]);
+	    $display("Got      %h", digest);
+	    $finish;
+	 end
+	 chain_c = $fread(chain_record, chain_f);
+      end
+   end
+
    reg [DW-1:0] word;
 
    reg [1024*8-1:0] filename = "";
+   reg [1024*8-1:0] tailname = "";
 
    integer 	    filesize;
+   integer 	    body_bytes;
    integer 	    f;
    integer 	    c;
 
@@ -124,13 +156,30 @@ module tb_sha256_stream();
       @(posedge clk);
 
       f = $fopen(filename, "rb");
+      filesize = 0;
+
+      // Virtual padding (pad.py --virtual): read the complete
+      // blocks of the unpadded file, then the tail file with the
+      // last partial block and the padding.
+      if ($value$plusargs("tail=%s", tailname)) begin
+	 c = $fseek(f, 0, 2);
+	 body_bytes = ($ftell(f) / 64) * 64;
+	 c = $fseek(f, 0, 0);
+	 while (filesize < body_bytes) begin
+	    c = $fread(word, f);
+	    writer.write_word(word);
+	    filesize = filesize + c;
+	 end
+	 $fclose(f);
+	 f = $fopen(tailname, "rb");
+      end
 
       c = $fread(word, f);
       while (c) begin
 	 writer.write_word(word);
+	 filesize = filesize + c;
 	 c = $fread(word, f);
       end
-      filesize = $ftell(f);
       $fclose(f);
 
       while(digested_blocks*64 < filesize)
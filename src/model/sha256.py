@@ -2,6 +2,13 @@
 # Python module imports.
 #-------------------------------------------------------------------
 import sys
+import time
+import random
+import tracemalloc
+import hashlib
+from array import array
+from collections import OrderedDict
+from sha256_codec import block_to_words, block_to_bytes, block_to_int, check_words
 
 
 #-------------------------------------------------------------------
@@ -9,19 +16,309 @@ import sys
 #-------------------------------------------------------------------
 VERBOSE = True
 HUGE = False
+SCHEDULE_CACHE_SIZE = 1024
+PREFIX_CACHE_SIZE = 4096
+
+# Round trace layout: the input H followed by t1, t2, k, w, a..h
+# for each of the 64 rounds.
+TRACE_HEAD_WORDS = 8
+TRACE_ROUND_WORDS = 12
+TRACE_BLOCK_WORDS = TRACE_HEAD_WORDS + 64 * TRACE_ROUND_WORDS
+
+IV_SHA224 = [0xc1059ed8, 0x367cd507, 0x3070dd17, 0xf70e5939,
+             0xffc00b31, 0x68581511, 0x64f98fa7, 0xbefa4fa4]
+
+IV_SHA256 = [0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a,
+             0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19]
+
+K = [0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5,
+     0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+     0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3,
+     0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+     0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc,
+     0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+     0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7,
+     0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+     0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13,
+     0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+     0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3,
+     0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+     0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5,
+     0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+     0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208,
+     0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2]
+
+
+#-------------------------------------------------------------------
+# Fast engine.
+#
+# The compression function is generated as straight-line Python
+# source with all 64 rounds unrolled, the K constants folded in as
+# literals and all working variables kept in locals. The state
+# variables are renamed each round instead of being shifted.
+# The message schedule is expanded by a separate generated function
+# that returns the 64 words as a tuple, so that expanded schedules
+# can be cached (see ScheduleCache).
+#
+# Rotations are done on a doubled copy of the word (x * 0x100000001)
+# so that a rotate is a single shift. Bits above bit 31 are left in
+# the sigma terms and are removed by the masking of the final sums.
+# Schedule words that are used in both sigma functions are only
+# doubled once. Maj is computed as b ^ ((a ^ b) & (b ^ c)) where
+# (b ^ c) is the (a ^ b) term from the previous round.
+#
+# A traced variant of the compression function also writes the
+# input chaining value and t1, t2, k, w, a..h after every round
+# into a preallocated array('I') (see sha256_trace).
+#
+# The functions are built the first time they are needed and then
+# reused. The round function does not depend on the mode (only
+# the initial H does), so both modes share the same function.
+#
+# SHA256 instances only use the fast engine when created with
+# fast=True. Measured on random single blocks (init() + next())
+# it does about 3.3x the blocks/s of the round engine and of the
+# original model, short of the 5x target, so the round engine
+# stays the default.
+#-------------------------------------------------------------------
+_fast_compress = None
+_traced_compress = None
+_fast_expand = None
+
+def _gen_expand_src():
+    src = ["def expand(block):"]
+    src.append("    w0, w1, w2, w3, w4, w5, w6, w7, w8, w9, w10, w11, "
+               "w12, w13, w14, w15 = block")
+    doubled = set()
+    for t in range(16, 64):
+        for i in (t - 2, t - 15):
+            if i not in doubled:
+                src.append("    u%d = w%d * 0x100000001" % (i, i))
+                doubled.add(i)
+        src.append("    w%d = ((u%d >> 17 ^ u%d >> 19 ^ w%d >> 10) + w%d +"
+                   " (u%d >> 7 ^ u%d >> 18 ^ w%d >> 3) + w%d) & 0xffffffff" %
+                   (t, t - 2, t - 2, t - 2, t - 7, t - 15, t - 15, t - 15, t - 16))
+    src.append("    return (%s)" % ", ".join(["w%d" % t for t in range(64)]))
+    return "\n".join(src) + "\n"
+
+
+def _gen_compress_src(trace = False):
+    if trace:
+        src = ["def compress(H, W, tr):"]
+    else:
+        src = ["def compress(H, W):"]
+    src.append("    (%s) = W" % ", ".join(["w%d" % t for t in range(64)]))
+    src.append("    a, b, c, d, e, f, g, h = H")
+    src.append("    x1 = b ^ c")
+    v = ["a", "b", "c", "d", "e", "f", "g", "h"]
+    if trace:
+        for i in range(8):
+            src.append("    tr[%d] = %s" % (i, v[i]))
+    for t in range(64):
+        a, b, c, d, e, f, g, h = v
+        x_new = "x%d" % (t & 1)
+        x_old = "x%d" % ((t + 1) & 1)
+        src.append("    u = %s * 0x100000001" % e)
+        src.append("    t1 = %s + (u >> 6 ^ u >> 11 ^ u >> 25) +"
+                   " (%s ^ (%s & (%s ^ %s))) + 0x%08x + w%d" %
+                   (h, g, e, f, g, K[t], t))
+        src.append("    u = %s * 0x100000001" % a)
+        src.append("    %s = %s ^ %s" % (x_new, a, b))
+        src.append("    %s = (%s + t1) & 0xffffffff" % (d, d))
+        if trace:
+            src.append("    t2 = ((u >> 2 ^ u >> 13 ^ u >> 22) +"
+                       " (%s ^ (%s & %s))) & 0xffffffff" % (b, x_new, x_old))
+            src.append("    %s = (t1 + t2) & 0xffffffff" % h)
+        else:
+            src.append("    %s = (t1 + (u >> 2 ^ u >> 13 ^ u >> 22) +"
+                       " (%s ^ (%s & %s))) & 0xffffffff" % (h, b, x_new, x_old))
+        v = [h, a, b, c, d, e, f, g]
+        if trace:
+            base = TRACE_HEAD_WORDS + t * TRACE_ROUND_WORDS
+            src.append("    tr[%d] = t1 & 0xffffffff" % base)
+            src.append("    tr[%d] = t2" % (base + 1))
+            src.append("    tr[%d] = 0x%08x" % (base + 2, K[t]))
+            src.append("    tr[%d] = w%d" % (base + 3, t))
+            for i in range(8):
+                src.append("    tr[%d] = %s" % (base + 4 + i, v[i]))
+    src.append("    return [(H[0] + %s) & 0xffffffff, (H[1] + %s) & 0xffffffff,\n"
+               "            (H[2] + %s) & 0xffffffff, (H[3] + %s) & 0xffffffff,\n"
+               "            (H[4] + %s) & 0xffffffff, (H[5] + %s) & 0xffffffff,\n"
+               "            (H[6] + %s) & 0xffffffff, (H[7] + %s) & 0xffffffff]" %
+               tuple(v))
+    return "\n".join(src) + "\n"
+
+
+def get_fast_compress():
+    global _fast_compress
+    if _fast_compress is None:
+        namespace = {}
+        exec(compile(_gen_compress_src(), "<sha256_fast>", "exec"), namespace)
+        _fast_compress = namespace["compress"]
+    return _fast_compress
+
+
+def get_traced_compress():
+    global _traced_compress
+    if _traced_compress is None:
+        namespace = {}
+        exec(compile(_gen_compress_src(trace=True), "<sha256_traced>", "exec"),
+             namespace)
+        _traced_compress = namespace["compress"]
+    return _traced_compress
+
+
+def get_fast_expand():
+    global _fast_expand
+    if _fast_expand is None:
+        namespace = {}
+        exec(compile(_gen_expand_src(), "<sha256_expand>", "exec"), namespace)
+        _fast_expand = namespace["expand"]
+    return _fast_expand
+
+
+#-------------------------------------------------------------------
+# ScheduleCache()
+#
+# Bounded LRU cache that maps a block (as a tuple of 16 words)
+# to its fully expanded 64 word schedule stored as an array('I').
+# Repeated blocks such as all padding final blocks then only
+# need the rounds. The hits and misses counters show how
+# effective the cache is. A maxsize of zero disables caching.
+#
+# A cache is given to SHA256(cache=...) and can be shared by
+# several instances. Instances without a cache expand every
+# block directly into a tuple, which is faster for non
+# repeating blocks. The cache is therefore only used where
+# blocks are expected to repeat, such as the scoreboard.
+#-------------------------------------------------------------------
+class ScheduleCache():
+    def __init__(self, maxsize = SCHEDULE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.schedules = OrderedDict()
+
+
+    def get(self, block):
+        key = tuple(block)
+        try:
+            W = self.schedules[key]
+            self.schedules.move_to_end(key)
+            self.hits += 1
+            return W
+        except KeyError:
+            pass
+
+        self.misses += 1
+        W = get_fast_expand()(key)
+        if self.maxsize > 0:
+            self.schedules[key] = array("I", W)
+            if len(self.schedules) > self.maxsize:
+                self.schedules.popitem(last=False)
+        return W
+
+
+    def clear(self):
+        self.schedules.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+    def info(self):
+        return (self.hits, self.misses, self.maxsize, len(self.schedules))
+
+
+
+#-------------------------------------------------------------------
+# PrefixCache()
+#
+# Bounded LRU cache of midstates for messages that share
+# leading blocks. The key for the first k blocks is a running
+# BLAKE2b hash of the mode and those blocks. Midstates are
+# stored after every stride blocks. hash_blocks() resumes from
+# the longest cached prefix and only compresses the remaining
+# blocks. hits and misses count compressed and skipped blocks.
+#-------------------------------------------------------------------
+class PrefixCache():
+    def __init__(self, maxsize = PREFIX_CACHE_SIZE, stride = 1):
+        self.maxsize = maxsize
+        self.stride = stride
+        self.hits = 0
+        self.misses = 0
+        self.states = OrderedDict()
+
+
+    def hash_blocks(self, blocks, mode = "sha256"):
+        keys = []
+        key_hash = hashlib.blake2b(mode.encode(), digest_size=16)
+        for i in range(len(blocks)):
+            key_hash.update(block_to_bytes(blocks[i]))
+            keys.append(key_hash.digest())
+
+        start = 0
+        for i in range(len(blocks) - (len(blocks) % self.stride),
+                       0, -self.stride):
+            if keys[i - 1] in self.states:
+                start = i
+                break
+
+        if start:
+            self.states.move_to_end(keys[start - 1])
+            my_sha = SHA256.from_state(self.states[keys[start - 1]], fast=True)
+        else:
+            my_sha = SHA256(mode=mode, fast=True)
+            my_sha.init()
+        self.hits += start
+        self.misses += len(blocks) - start
+
+        for i in range(start, len(blocks)):
+            my_sha.next(blocks[i])
+            if (i + 1) % self.stride == 0 and self.maxsize > 0:
+                self.states[keys[i]] = my_sha.export_state()
+                self.states.move_to_end(keys[i])
+                if len(self.states) > self.maxsize:
+                    self.states.popitem(last=False)
+        return my_sha
+
+
+    def clear(self):
+        self.states.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+    def info(self):
+        return (self.hits, self.misses, self.maxsize, len(self.states))
+
 
 #-------------------------------------------------------------------
 # SHA256()
 #-------------------------------------------------------------------
 class SHA256():
-    def __init__(self, mode="sha256", verbose = 0):
+    # The round by round debug state (t1, t2, a..h, w, W, k) is
+    # only used by the verbose engine. K is shared by all instances.
+    __slots__ = ("mode", "verbose", "fast", "trace", "cache", "H", "blocks",
+                 "t1", "t2", "a", "b", "c", "d", "e", "f", "g", "h",
+                 "w", "W", "k")
+    K = K
+
+    def __init__(self, mode="sha256", verbose = 0, fast = False, trace = None,
+                 cache = None):
         if mode not in ["sha224", "sha256"]:
             print("Error: Given %s is not a supported mode." % mode)
             return 0
 
         self.mode = mode
         self.verbose = verbose
+        self.fast = fast
+        if fast:
+            get_fast_compress()
+            get_fast_expand()
+        self.trace = trace
+        self.cache = cache
         self.H = [0] * 8
+        self.blocks = 0
         self.t1 = 0
         self.t2 = 0
         self.a = 0
@@ -33,51 +330,100 @@ class SHA256():
         self.g = 0
         self.h = 0
         self.w = 0
-        self.W = [0] * 16
+        self.W = None
         self.k = 0
-        self.K = [0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5,
-                  0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
-                  0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3,
-                  0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
-                  0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc,
-                  0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
-                  0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7,
-                  0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
-                  0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13,
-                  0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
-                  0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3,
-                  0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
-                  0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5,
-                  0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
-                  0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208,
-                  0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2]
 
 
+    # The IV is written into the existing H list, get_digest()
+    # returns a copy that stays valid after init() and reset().
     def init(self):
         if self.mode == "sha256":
-            self.H = [0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a,
-                      0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19]
+            self.H[:] = IV_SHA256
         else:
-            self.H = [0xc1059ed8, 0x367cd507, 0x3070dd17, 0xf70e5939,
-                      0xffc00b31, 0x68581511, 0x64f98fa7, 0xbefa4fa4]
-
+            self.H[:] = IV_SHA224
+        self.blocks = 0
+
+
+    # Change mode and init, so that one instance can be reused
+    # for many messages.
+    def reset(self, mode = None):
+        if mode is not None:
+            if mode not in ["sha224", "sha256"]:
+                print("Error: Given %s is not a supported mode." % mode)
+                return
+            self.mode = mode
+        self.init()
+
+    # The block can be a list or tuple of 16 words, a 512 bit int
+    # or a 64 byte bytes-like object (see sha256_codec).
     def next(self, block):
+        if isinstance(block, (list, tuple)):
+            check_words(block)
+        else:
+            block = block_to_words(block)
+        self.blocks += 1
+
+        # The verbose (debug) engine prints the state in every round
+        # and therefore always uses the round by round implementation.
+        # A trace recorder (see sha256_trace) gets the state of every
+        # round from either engine.
+        if self.fast and not self.verbose:
+            if self.cache is None:
+                W = _fast_expand(block)
+            else:
+                W = self.cache.get(block)
+            if self.trace is None:
+                self.H = _fast_compress(self.H, W)
+            else:
+                self.H = get_traced_compress()(self.H, W, self.trace.buf)
+                self.trace.end_block()
+            return
+
         self._W_schedule(block)
         self._copy_digest()
         if self.verbose:
             print("State after init:")
             self._print_state(0)
+        if self.trace is not None:
+            self.trace.buf[0 : TRACE_HEAD_WORDS] = array("I", self.H)
 
         for i in range(64):
             self._sha256_round(i)
             if self.verbose:
                 self._print_state(i)
+            if self.trace is not None:
+                self._trace_state(i)
 
         self._update_digest()
+        if self.trace is not None:
+            self.trace.end_block()
 
 
     def get_digest(self):
-        return self.H
+        return list(self.H)
+
+
+    # The midstate is the chaining value H and the number of
+    # blocks processed so far. Exported states are plain dicts
+    # that can be pickled and restored with from_state().
+    def copy(self):
+        other = SHA256(mode=self.mode, verbose=self.verbose, fast=self.fast,
+                       cache=self.cache)
+        other.H = list(self.H)
+        other.blocks = self.blocks
+        return other
+
+
+    def export_state(self):
+        return {"mode" : self.mode, "H" : list(self.H), "blocks" : self.blocks}
+
+
+    @classmethod
+    def from_state(cls, state, verbose = 0, fast = False, cache = None):
+        other = cls(mode=state["mode"], verbose=verbose, fast=fast, cache=cache)
+        other.H = list(state["H"])
+        other.blocks = state["blocks"]
+        return other
 
 
     def _copy_digest(self):
@@ -113,6 +459,13 @@ class SHA256():
         print("")
 
 
+    def _trace_state(self, round):
+        base = TRACE_HEAD_WORDS + round * TRACE_ROUND_WORDS
+        self.trace.buf[base : base + TRACE_ROUND_WORDS] = array("I",
+            (self.t1, self.t2, self.k, self.w, self.a, self.b,
+             self.c, self.d, self.e, self.f, self.g, self.h))
+
+
     def _sha256_round(self, round):
         self.k = self.K[round]
         self.w = self._next_w(round)
@@ -143,9 +496,12 @@ class SHA256():
             return tmp_w
 
 
+    # The W window is allocated on the first block and then
+    # reused.
     def _W_schedule(self, block):
-        for i in range(16):
-            self.W[i] = block[i]
+        if self.W is None:
+            self.W = [0] * 16
+        self.W[:] = block
 
 
     def _Ch(self, x, y, z):
@@ -461,12 +817,229 @@ def sha256_issue_test():
     print("")
 
 
+#-------------------------------------------------------------------
+# engine_tests()
+#
+# Check that the fast engine and the round by round engine
+# give identical digests for random multi block messages.
+#-------------------------------------------------------------------
+def engine_tests(n = 100):
+    print("Running fast vs round engine test with %d messages:" % n)
+    cache = ScheduleCache(maxsize=8)
+    tail = [random.getrandbits(32) for k in range(16)]
+    for mode in ["sha224", "sha256"]:
+        fast_sha = SHA256(mode=mode, fast=True)
+        cached_sha = SHA256(mode=mode, fast=True, cache=cache)
+        round_sha = SHA256(mode=mode, fast=False)
+        for i in range(n):
+            fast_sha.init()
+            cached_sha.init()
+            round_sha.init()
+            # Every message ends with the same block, which the
+            # cached instance gets from the cache.
+            blocks = [[random.getrandbits(32) for k in range(16)]
+                      for j in range(random.randint(0, 3))] + [tail]
+            for block in blocks:
+                fast_sha.next(block)
+                cached_sha.next(block)
+                round_sha.next(block)
+            if ((fast_sha.get_digest() != round_sha.get_digest()) or
+                (cached_sha.get_digest() != round_sha.get_digest())):
+                break
+        compare_digests(fast_sha.get_digest(), round_sha.get_digest())
+        compare_digests(cached_sha.get_digest(), round_sha.get_digest())
+    print("Schedule cache: %d hits, %d misses, maxsize %d, currsize %d." %
+          cache.info())
+    print("")
+
+
+#-------------------------------------------------------------------
+# codec_tests()
+#
+# Check that a block given as words, int and bytes gives the
+# same digest. The second block of NIST TC2 starts with zero
+# words, which a hex string round trip would drop.
+#-------------------------------------------------------------------
+def codec_tests():
+    print("Running block form tests:")
+    TC2_1_block = [0x61626364, 0x62636465, 0x63646566, 0x64656667,
+                   0x65666768, 0x66676869, 0x6768696A, 0x68696A6B,
+                   0x696A6B6C, 0x6A6B6C6D, 0x6B6C6D6E, 0x6C6D6E6F,
+                   0x6D6E6F70, 0x6E6F7071, 0x80000000, 0x00000000]
+
+    TC2_2_block = [0x00000000, 0x00000000, 0x00000000, 0x00000000,
+                   0x00000000, 0x00000000, 0x00000000, 0x00000000,
+                   0x00000000, 0x00000000, 0x00000000, 0x00000000,
+                   0x00000000, 0x00000000, 0x00000000, 0x000001C0]
+
+    TC2_expected = [0x248D6A61, 0xD20638B8, 0xE5C02693, 0x0C3E6039,
+                    0xA33CE459, 0x64FF2167, 0xF6ECEDD4, 0x19DB06C1]
+
+    my_sha256 = SHA256()
+    for convert in [list, block_to_int, block_to_bytes,
+                    lambda block: bytearray(block_to_bytes(block)),
+                    lambda block: memoryview(block_to_bytes(block))]:
+        my_sha256.init()
+        my_sha256.next(convert(TC2_1_block))
+        my_sha256.next(convert(TC2_2_block))
+        compare_digests(my_sha256.get_digest(), TC2_expected)
+
+    # Word lists and tuples are not converted, but still checked.
+    for fast in [False, True]:
+        my_sha256 = SHA256(fast=fast)
+        for block in [TC2_1_block[:15], TC2_1_block[:15] + [1 << 32],
+                      tuple(TC2_1_block[:15]) + (-1,), TC2_1_block + [0]]:
+            try:
+                my_sha256.next(block)
+                print("Error: next() accepted the invalid block %s." % (block,))
+            except ValueError:
+                pass
+    print("")
+
+
+#-------------------------------------------------------------------
+# midstate_tests()
+#
+# Check copy(), export/import of the midstate, that the prefix
+# cache gives the same digests as hashing from scratch and that
+# a digest held across reset() is not overwritten.
+#-------------------------------------------------------------------
+def midstate_tests():
+    print("Running midstate and prefix cache tests:")
+    header = [[random.getrandbits(32) for k in range(16)] for i in range(6)]
+    my_cache = PrefixCache(stride=2)
+    correct = True
+    for mode in ["sha224", "sha256"]:
+        for i in range(10):
+            blocks = header + [[random.getrandbits(32) for k in range(16)]
+                               for j in range(i % 3 + 1)]
+            my_sha = SHA256(mode=mode)
+            my_sha.init()
+            for block in blocks[:3]:
+                my_sha.next(block)
+            my_copy = my_sha.copy()
+            my_restored = SHA256.from_state(my_sha.export_state())
+            for block in blocks[3:]:
+                my_sha.next(block)
+                my_copy.next(block)
+                my_restored.next(block)
+
+            my_cached = my_cache.hash_blocks(blocks, mode)
+            if ((my_copy.get_digest() != my_sha.get_digest()) or
+                (my_restored.get_digest() != my_sha.get_digest()) or
+                (my_cached.get_digest() != my_sha.get_digest()) or
+                (my_cached.blocks != len(blocks))):
+                correct = False
+
+            # A digest held across reset() must not change.
+            my_digest = my_sha.get_digest()
+            expected = list(my_digest)
+            my_sha.reset()
+            my_sha.next(blocks[0])
+            if my_digest != expected:
+                correct = False
+
+    if correct:
+        print("Test case ok.")
+    else:
+        print("Error: midstate or prefix cache digest mismatch.")
+    print("Prefix cache: %d blocks skipped, %d blocks compressed." %
+          (my_cache.hits, my_cache.misses))
+    print("")
+
+
+#-------------------------------------------------------------------
+# _BaselineSHA256()
+#
+# The instance layout of the model before __slots__ and the
+# shared tables: a __dict__ with a private copy of K, and new H
+# and W lists for every message and block. Only used as the
+# "before" case of instance_benchmark().
+#-------------------------------------------------------------------
+class _BaselineSHA256(SHA256):
+    def __init__(self, mode="sha256"):
+        SHA256.__init__(self, mode)
+        self.K = list(K)
+
+
+    def init(self):
+        if self.mode == "sha256":
+            self.H = list(IV_SHA256)
+        else:
+            self.H = list(IV_SHA224)
+        self.blocks = 0
+
+
+    def _W_schedule(self, block):
+        self.W = [block[i] for i in range(16)]
+
+
+#-------------------------------------------------------------------
+# instance_benchmark()
+#
+# Measure the allocated bytes per instance and the number of
+# single block transactions per second of the round engine.
+# "Before" is the baseline layout with a new instance per
+# transaction, as the scoreboard used to do, "after" is one
+# instance reused with reset(). The two are timed in alternating
+# rounds and the median rate is reported.
+#-------------------------------------------------------------------
+def instance_benchmark(n = 2000, rounds = 10, batch = 300):
+    print("Running instance benchmark:")
+    block = [random.getrandbits(32) for i in range(16)]
+    modes = ["sha224", "sha256"]
+
+    def new_instance(cls, mode):
+        my_sha256 = cls(mode=mode)
+        my_sha256.init()
+        return my_sha256
+
+    def before(i):
+        my_sha256 = new_instance(_BaselineSHA256, modes[i & 1])
+        my_sha256.next(block)
+        return my_sha256.get_digest()
+
+    my_sha256 = SHA256()
+    def after(i):
+        my_sha256.reset(modes[i & 1])
+        my_sha256.next(block)
+        return my_sha256.get_digest()
+
+    cases = [("Before", _BaselineSHA256, before), ("After", SHA256, after)]
+    sizes = []
+    for (name, cls, transaction) in cases:
+        tracemalloc.start()
+        start_mem = tracemalloc.get_traced_memory()[0]
+        instances = [new_instance(cls, "sha256") for i in range(n)]
+        sizes.append((tracemalloc.get_traced_memory()[0] - start_mem) / n)
+        tracemalloc.stop()
+        del instances
+
+    rates = [[], []]
+    for r in range(rounds):
+        for (i, (name, cls, transaction)) in enumerate(cases):
+            start = time.process_time()
+            for j in range(batch):
+                transaction(j)
+            rates[i].append(batch / (time.process_time() - start))
+
+    for (i, (name, cls, transaction)) in enumerate(cases):
+        rates[i].sort()
+        print("%-6s %7.1f bytes/instance, %8.1f transactions/s" %
+              (name, sizes[i], rates[i][rounds // 2]))
+    print("")
+
+
 #-------------------------------------------------------------------
 # main()
 #
 # If executed tests the sha256 class using known test vectors.
 #-------------------------------------------------------------------
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--bench":
+        instance_benchmark()
+        return
+
     print("Testing the SHA-256 Python model.")
     print("---------------------------------")
     print("")
@@ -474,6 +1047,9 @@ def main():
     sha224_tests()
     sha256_tests()
     sha256_issue_test()
+    engine_tests()
+    codec_tests()
+    midstate_tests()
 
 
 #-------------------------------------------------------------------
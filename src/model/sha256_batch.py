@@ -0,0 +1,200 @@
+#-------------------------------------------------------------------
+# sha256_batch.py
+#
+# NumPy based batch engine for the SHA256 model. Compresses N
+# independent blocks at once by running the 64 rounds as
+# vectorized uint32 operations over all lanes. Each lane can
+# be in SHA-224 or SHA-256 mode.
+#
+# Requires NumPy.
+#-------------------------------------------------------------------
+
+#-------------------------------------------------------------------
+# Python module imports.
+#-------------------------------------------------------------------
+import sys
+import random
+import numpy as np
+from sha256 import SHA256, K, IV_SHA224, IV_SHA256
+
+
+#-------------------------------------------------------------------
+# Constants.
+#-------------------------------------------------------------------
+IV_SHA224_BATCH = np.array(IV_SHA224, dtype=np.uint32)
+IV_SHA256_BATCH = np.array(IV_SHA256, dtype=np.uint32)
+K_BATCH = np.array(K, dtype=np.uint32)
+
+
+#-------------------------------------------------------------------
+# SHA256Batch()
+#
+# init() takes either a mode name used for all lanes or a
+# sequence with one mode bit per lane (1 = sha256, 0 = sha224,
+# as the mode input of the core). next() takes an (N, 16) array
+# of blocks, one block per lane. get_digest() returns the (N, 8)
+# array of chaining values.
+#-------------------------------------------------------------------
+class SHA256Batch():
+    def __init__(self):
+        self.H = np.zeros((0, 8), dtype=np.uint32)
+
+
+    def init(self, n, mode = "sha256"):
+        if isinstance(mode, str):
+            if mode not in ["sha224", "sha256"]:
+                raise ValueError("Given %s is not a supported mode." % mode)
+            mode_bits = np.full(n, mode == "sha256")
+        else:
+            mode_bits = np.asarray(mode, dtype=bool)
+            if mode_bits.shape != (n,):
+                raise ValueError("Expected %d mode bits, got shape %s." %
+                                 (n, mode_bits.shape))
+        self.H = np.where(mode_bits[:, None], IV_SHA256_BATCH,
+                          IV_SHA224_BATCH)
+
+
+    def next(self, blocks):
+        blocks = np.asarray(blocks, dtype=np.uint32)
+        if blocks.shape != (self.H.shape[0], 16):
+            raise ValueError("Expected blocks of shape (%d, 16), got %s." %
+                             (self.H.shape[0], blocks.shape))
+
+        # Work on one row per word so every operation is a
+        # contiguous uint32 vector over all lanes.
+        W = np.empty((64, blocks.shape[0]), dtype=np.uint32)
+        W[:16] = blocks.T
+        for t in range(16, 64):
+            x = W[t - 15]
+            y = W[t - 2]
+            W[t] = ((_rotr(y, 17) ^ _rotr(y, 19) ^ (y >> np.uint32(10))) +
+                    W[t - 7] +
+                    (_rotr(x, 7) ^ _rotr(x, 18) ^ (x >> np.uint32(3))) +
+                    W[t - 16])
+
+        a, b, c, d, e, f, g, h = self.H.T.copy()
+        for t in range(64):
+            t1 = (h + (_rotr(e, 6) ^ _rotr(e, 11) ^ _rotr(e, 25)) +
+                  ((e & f) ^ (~e & g)) + K_BATCH[t] + W[t])
+            t2 = ((_rotr(a, 2) ^ _rotr(a, 13) ^ _rotr(a, 22)) +
+                  ((a & b) ^ (a & c) ^ (b & c)))
+            h = g
+            g = f
+            f = e
+            e = d + t1
+            d = c
+            c = b
+            b = a
+            a = t1 + t2
+
+        self.H = self.H + np.stack([a, b, c, d, e, f, g, h], axis=1)
+
+
+    def get_digest(self):
+        return self.H
+
+
+#-------------------------------------------------------------------
+# _rotr()
+#
+# Rotate right of uint32 arrays. Bits shifted out to the left
+# are dropped by the uint32 type.
+#-------------------------------------------------------------------
+def _rotr(x, r):
+    return (x >> np.uint32(r)) | (x << np.uint32(32 - r))
+
+
+#-------------------------------------------------------------------
+# sha256_batch()
+#
+# Single block digests for all rows in blocks.
+#-------------------------------------------------------------------
+def sha256_batch(blocks, mode = "sha256"):
+    blocks = np.asarray(blocks, dtype=np.uint32)
+    my_batch = SHA256Batch()
+    my_batch.init(blocks.shape[0], mode)
+    my_batch.next(blocks)
+    return my_batch.get_digest()
+
+
+#-------------------------------------------------------------------
+# batch_tests()
+#
+# Check the batch engine against the scalar model. The lanes
+# are the NIST single and double block vectors from
+# sha256_tests() mixed with random blocks, in both modes.
+#-------------------------------------------------------------------
+def batch_tests(n = 256):
+    print("Running batch engine tests with %d lanes:" % n)
+    TC1_block = [0x61626380, 0x00000000, 0x00000000, 0x00000000,
+                 0x00000000, 0x00000000, 0x00000000, 0x00000000,
+                 0x00000000, 0x00000000, 0x00000000, 0x00000000,
+                 0x00000000, 0x00000000, 0x00000000, 0x00000018]
+
+    TC2_1_block = [0x61626364, 0x62636465, 0x63646566, 0x64656667,
+                   0x65666768, 0x66676869, 0x6768696A, 0x68696A6B,
+                   0x696A6B6C, 0x6A6B6C6D, 0x6B6C6D6E, 0x6C6D6E6F,
+                   0x6D6E6F70, 0x6E6F7071, 0x80000000, 0x00000000]
+
+    TC2_2_block = [0x00000000, 0x00000000, 0x00000000, 0x00000000,
+                   0x00000000, 0x00000000, 0x00000000, 0x00000000,
+                   0x00000000, 0x00000000, 0x00000000, 0x00000000,
+                   0x00000000, 0x00000000, 0x00000000, 0x000001C0]
+
+    TC2_expected = [0x248D6A61, 0xD20638B8, 0xE5C02693, 0x0C3E6039,
+                    0xA33CE459, 0x64FF2167, 0xF6ECEDD4, 0x19DB06C1]
+
+    blocks = [[[random.getrandbits(32) for j in range(16)] for i in range(n)]
+              for k in range(2)]
+    blocks[0][0] = TC1_block
+    blocks[0][1] = TC1_block
+    blocks[0][2] = TC2_1_block
+    blocks[1][2] = TC2_2_block
+    mode_bits = [random.randint(0, 1) for i in range(n)]
+    mode_bits[0] = 0
+    mode_bits[1] = 1
+    mode_bits[2] = 1
+
+    my_batch = SHA256Batch()
+    my_batch.init(n, mode_bits)
+    errors = 0
+    for k in range(2):
+        my_batch.next(blocks[k])
+        digests = my_batch.get_digest()
+        for i in range(n):
+            my_sha256 = SHA256(mode=["sha224", "sha256"][mode_bits[i]])
+            my_sha256.init()
+            for j in range(k + 1):
+                my_sha256.next(blocks[j][i])
+            if my_sha256.get_digest() != [int(x) for x in digests[i]]:
+                print("Error: lane %d differs after block %d." % (i, k))
+                errors += 1
+
+    if [int(x) for x in my_batch.get_digest()[2]] != TC2_expected:
+        print("Error: NIST double block vector failed.")
+        errors += 1
+
+    if errors == 0:
+        print("Test case ok.")
+    print("")
+
+
+#-------------------------------------------------------------------
+# main()
+#-------------------------------------------------------------------
+def main():
+    batch_tests()
+
+
+#-------------------------------------------------------------------
+# __name__
+# Python thingy which allows the file to be run standalone as
+# well as parsed from within a Python interpreter.
+#-------------------------------------------------------------------
+if __name__=="__main__":
+    # Run the main function.
+    sys.exit(main())
+
+#=======================================================================
+# EOF sha256_batch.py
+#=======================================================================
@@ -0,0 +1,217 @@
+#-------------------------------------------------------------------
+# sha256_bench.py
+#
+# Benchmark suite for the SHA256 model. Measures blocks/s and
+# bytes/s for SHA-224 and SHA-256 with:
+#   - the fast engine, the round engine and verbose mode
+#     (with the printout sent to /dev/null),
+#   - single block messages and 1000 block chains,
+#   - complete messages of different sizes through the hashlib
+#     like interface, including padding.
+#
+# Every case is run a number of warmup rounds, then timed over
+# a number of repeats. The best time is reported. The model
+# instances run without a schedule cache, so every block is
+# expanded and compressed.
+#
+# Usage:
+#   python sha256_bench.py [--repeats N] [--warmup N]
+#                          [--json FILE] [--baseline FILE]
+#                          [--tolerance FRACTION]
+#
+# --json writes the results, --baseline compares them to
+# results written before and returns 1 if any case is slower
+# than the baseline by more than the tolerance.
+#-------------------------------------------------------------------
+
+#-------------------------------------------------------------------
+# Python module imports.
+#-------------------------------------------------------------------
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import contextlib
+from sha256 import SHA256
+import sha256_hasher
+
+
+#-------------------------------------------------------------------
+# Constants.
+#-------------------------------------------------------------------
+BLOCK_SIZE = 64
+CHAIN_LENGTHS = [1, 1000]
+MESSAGE_SIZES = [55, 64, 1000, 16384, 65536]
+ENGINES = {"fast"    : {"fast" : True,  "verbose" : 0},
+           "round"   : {"fast" : False, "verbose" : 0},
+           "verbose" : {"fast" : False, "verbose" : 1}}
+DEFAULT_TOLERANCE = 0.10
+
+
+#-------------------------------------------------------------------
+# _random_blocks()
+#-------------------------------------------------------------------
+def _random_blocks(n):
+    return [[random.getrandbits(32) for j in range(16)] for i in range(n)]
+
+
+#-------------------------------------------------------------------
+# block_case()
+#
+# Returns a function that hashes n blocks as messages of chain
+# blocks each, and the number of blocks and bytes it hashes.
+#-------------------------------------------------------------------
+def block_case(mode, engine, chain, n = 1000):
+    blocks = _random_blocks(n)
+    my_sha256 = SHA256(mode=mode, **ENGINES[engine])
+
+    def run():
+        for i in range(0, n, chain):
+            my_sha256.reset()
+            for block in blocks[i : i + chain]:
+                my_sha256.next(block)
+            my_sha256.get_digest()
+
+    return (run, n, n * BLOCK_SIZE)
+
+
+#-------------------------------------------------------------------
+# message_case()
+#
+# Returns a function that hashes a message of the given size
+# through the hashlib like interface, and the number of blocks
+# (including padding) and bytes it hashes.
+#-------------------------------------------------------------------
+def message_case(mode, size):
+    message = os.urandom(size)
+    cls = sha256_hasher.get_class(mode)
+
+    def run():
+        cls(message).digest()
+
+    return (run, (size + 8) // BLOCK_SIZE + 1, size)
+
+
+#-------------------------------------------------------------------
+# time_case()
+#
+# Run a case warmup times, then time it repeats times. Returns
+# the best and the median time in seconds.
+#-------------------------------------------------------------------
+def time_case(run, repeats = 5, warmup = 1):
+    times = []
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            for i in range(warmup + repeats):
+                start = time.perf_counter()
+                run()
+                if i >= warmup:
+                    times.append(time.perf_counter() - start)
+    times.sort()
+    return (times[0], times[len(times) // 2])
+
+
+#-------------------------------------------------------------------
+# run_benchmarks()
+#
+# Run all cases and return a list of result dicts.
+#-------------------------------------------------------------------
+def run_benchmarks(repeats = 5, warmup = 1):
+    cases = []
+    for mode in ["sha224", "sha256"]:
+        for engine in ENGINES:
+            for chain in CHAIN_LENGTHS:
+                cases.append(("%s/%s/chain%d" % (mode, engine, chain),
+                              block_case(mode, engine, chain)))
+        for size in MESSAGE_SIZES:
+            cases.append(("%s/message%d" % (mode, size),
+                          message_case(mode, size)))
+
+    results = []
+    for (name, (run, blocks, size)) in cases:
+        (best, median) = time_case(run, repeats, warmup)
+        result = {"name" : name, "blocks" : blocks, "bytes" : size,
+                  "best_s" : best, "median_s" : median,
+                  "blocks_per_s" : blocks / best,
+                  "bytes_per_s" : size / best}
+        print("%-26s %10.1f blocks/s %12.1f bytes/s" %
+              (name, result["blocks_per_s"], result["bytes_per_s"]))
+        results.append(result)
+    return results
+
+
+#-------------------------------------------------------------------
+# compare_baseline()
+#
+# Compare results to a baseline result list. Returns the names
+# of the cases that are slower than the baseline by more than
+# tolerance (a fraction).
+#-------------------------------------------------------------------
+def compare_baseline(results, baseline, tolerance = DEFAULT_TOLERANCE):
+    baseline_rates = {r["name"] : r["blocks_per_s"] for r in baseline}
+    slower = []
+    for result in results:
+        if result["name"] not in baseline_rates:
+            continue
+        ratio = result["blocks_per_s"] / baseline_rates[result["name"]]
+        if ratio < 1.0 - tolerance:
+            print("Slowdown: %-26s %6.1f%% of baseline" %
+                  (result["name"], 100.0 * ratio))
+            slower.append(result["name"])
+    return slower
+
+
+#-------------------------------------------------------------------
+# main()
+#-------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SHA256 "
+                                     "Python model.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--json", default=None,
+                        help="write the results to this file")
+    parser.add_argument("--baseline", default=None,
+                        help="compare to results in this file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown as a fraction")
+    args = parser.parse_args()
+
+    print("Running SHA256 model benchmarks:")
+    results = run_benchmarks(args.repeats, args.warmup)
+    print("")
+
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump({"python" : platform.python_version(),
+                       "machine" : platform.machine(),
+                       "repeats" : args.repeats,
+                       "warmup" : args.warmup,
+                       "results" : results}, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        slower = compare_baseline(results, baseline, args.tolerance)
+        if slower:
+            print("%d cases slower than baseline." % len(slower))
+            return 1
+        print("No slowdown beyond %.0f%% of baseline." % (100 * args.tolerance))
+    return 0
+
+
+#-------------------------------------------------------------------
+# __name__
+# Python thingy which allows the file to be run standalone as
+# well as parsed from within a Python interpreter.
+#-------------------------------------------------------------------
+if __name__=="__main__":
+    # Run the main function.
+    sys.exit(main())
+
+#=======================================================================
+# EOF sha256_bench.py
+#=======================================================================
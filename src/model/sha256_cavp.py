@@ -0,0 +1,356 @@
+#-------------------------------------------------------------------
+# sha256_cavp.py
+#
+# Runner for the NIST CAVP SHA-2 test vectors (SHAVS) on the
+# SHA256 model. Reads the .rsp response files from disk:
+#   - SHA224ShortMsg.rsp, SHA256ShortMsg.rsp,
+#     SHA224LongMsg.rsp, SHA256LongMsg.rsp (also the bit
+#     oriented variants, the model pads the bit length itself)
+#   - SHA224Monte.rsp, SHA256Monte.rsp
+#
+# The mode is taken from the [L = 28] or [L = 32] section of
+# each file, files for other digest lengths are skipped.
+#
+# Message vectors are checked in chunks and every one of the
+# 100 Monte Carlo checkpoints is checked on its own, starting
+# from the previous checkpoint digest in the file, so all work
+# can be spread over a process pool. Only failures and one
+# summary line are printed.
+#
+# Every vector is checked with each selected engine of the
+# model, by default both the round engine and the fast engine.
+#
+# Usage:
+#   python sha256_cavp.py [--jobs N] [--engine round|fast|both]
+#                         FILE_OR_DIR ...
+#   python sha256_cavp.py            (runs the self tests)
+#-------------------------------------------------------------------
+
+#-------------------------------------------------------------------
+# Python module imports.
+#-------------------------------------------------------------------
+import os
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from sha256 import SHA256
+from sha256_codec import BLOCK_BYTES, digest_to_bytes
+from sha256_padder import padding_tail
+
+
+#-------------------------------------------------------------------
+# Constants.
+#-------------------------------------------------------------------
+DIGEST_LENGTHS = {28 : "sha224", 32 : "sha256"}
+MONTE_ITERATIONS = 1000
+MESSAGES_PER_JOB = 16
+ENGINES = {"round" : False, "fast" : True}
+
+
+#-------------------------------------------------------------------
+# parse_rsp()
+#
+# Parse a response file. Returns the mode and a list of cases:
+# ("msg", bit_length, message, expected) for message vectors,
+# ("monte", count, seed, expected) for Monte Carlo checkpoints.
+# Returns mode None for files that are not for SHA-224/256.
+#-------------------------------------------------------------------
+def parse_rsp(path):
+    mode = None
+    cases = []
+    fields = {}
+    seed = None
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if (not line) or line.startswith("#"):
+                continue
+            if line.startswith("["):
+                (key, value) = line.strip("[]").split("=")
+                if key.strip() == "L":
+                    mode = DIGEST_LENGTHS.get(int(value))
+                continue
+
+            (key, value) = [x.strip() for x in line.split("=", 1)]
+            if key == "Seed":
+                seed = bytes.fromhex(value)
+            elif key == "MD":
+                expected = bytes.fromhex(value)
+                if "COUNT" in fields:
+                    cases.append(("monte", int(fields["COUNT"]), seed, expected))
+                    seed = expected
+                else:
+                    cases.append(("msg", int(fields["Len"]),
+                                  bytes.fromhex(fields["Msg"]), expected))
+                fields = {}
+            else:
+                fields[key] = value
+    return (mode, cases)
+
+
+#-------------------------------------------------------------------
+# message_blocks()
+#
+# Pad a message of bit_length bits (the leftmost bits of
+# message) and return the list of 64 byte blocks.
+#-------------------------------------------------------------------
+def message_blocks(message, bit_length):
+    (length, bits) = divmod(bit_length, 8)
+    end = length - (length % BLOCK_BYTES)
+    rest = message[end : length + (1 if bits else 0)]
+    data = message[:end] + padding_tail(length, rest, bits)
+    return [data[i : i + BLOCK_BYTES] for i in range(0, len(data), BLOCK_BYTES)]
+
+
+#-------------------------------------------------------------------
+# model_digest()
+#
+# Digest bytes of a message hashed with the model.
+#-------------------------------------------------------------------
+def model_digest(my_sha256, message, bit_length):
+    my_sha256.reset()
+    for block in message_blocks(message, bit_length):
+        my_sha256.next(block)
+    length = 7 if my_sha256.mode == "sha224" else 8
+    return digest_to_bytes(my_sha256.get_digest(), length)
+
+
+#-------------------------------------------------------------------
+# monte_carlo()
+#
+# One Monte Carlo checkpoint: MD0 = MD1 = MD2 = seed, then
+# MDi = SHA(MDi-3 || MDi-2 || MDi-1) for i = 3..1002. Returns
+# MD1002. The messages always have the same length, so the
+# padding is computed once.
+#-------------------------------------------------------------------
+def monte_carlo(mode, seed, iterations = MONTE_ITERATIONS, fast = False):
+    my_sha256 = SHA256(mode=mode, fast=fast)
+    length = 7 if mode == "sha224" else 8
+    rest = (3 * len(seed)) % BLOCK_BYTES
+    tail = bytes(padding_tail(3 * len(seed), bytes(rest))[rest:])
+
+    md = [seed, seed, seed]
+    for i in range(iterations):
+        data = md[0] + md[1] + md[2] + tail
+        my_sha256.reset()
+        for j in range(0, len(data), BLOCK_BYTES):
+            my_sha256.next(data[j : j + BLOCK_BYTES])
+        md = [md[1], md[2], digest_to_bytes(my_sha256.get_digest(), length)]
+    return md[2]
+
+
+#-------------------------------------------------------------------
+# _check_messages()
+# _check_monte()
+#
+# Process pool jobs for the named engine. Both return a list
+# of failure strings.
+#-------------------------------------------------------------------
+def _check_messages(name, mode, cases, engine):
+    my_sha256 = SHA256(mode=mode, fast=ENGINES[engine])
+    failures = []
+    for (kind, bit_length, message, expected) in cases:
+        if model_digest(my_sha256, message, bit_length) != expected:
+            failures.append("%s: Len = %d failed, %s engine." %
+                            (name, bit_length, engine))
+    return failures
+
+
+def _check_monte(name, mode, count, seed, expected, engine):
+    if monte_carlo(mode, seed, fast=ENGINES[engine]) != expected:
+        return ["%s: COUNT = %d failed, %s engine." % (name, count, engine)]
+    return []
+
+
+#-------------------------------------------------------------------
+# _rsp_files()
+#
+# Expand directories to the .rsp files in them.
+#-------------------------------------------------------------------
+def _rsp_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted([os.path.join(path, x) for x in os.listdir(path)
+                             if x.endswith(".rsp")])
+        else:
+            files.append(path)
+    return files
+
+
+#-------------------------------------------------------------------
+# run_cavp()
+#
+# Run all vectors in the given files and directories with each
+# of the given engines. A vector counts once per engine.
+# Returns (passed, failures, skipped files).
+#-------------------------------------------------------------------
+def run_cavp(paths, jobs = None, engines = list(ENGINES)):
+    skipped = []
+    passed = 0
+    failures = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = []
+        for path in _rsp_files(paths):
+            name = os.path.basename(path)
+            (mode, cases) = parse_rsp(path)
+            if (mode is None) or (not cases):
+                skipped.append(name)
+                continue
+
+            messages = [case for case in cases if case[0] == "msg"]
+            for engine in engines:
+                for i in range(0, len(messages), MESSAGES_PER_JOB):
+                    chunk = messages[i : i + MESSAGES_PER_JOB]
+                    futures.append((len(chunk), executor.submit(
+                        _check_messages, name, mode, chunk, engine)))
+
+                for (kind, count, seed, expected) in cases:
+                    if kind == "monte":
+                        futures.append((1, executor.submit(
+                            _check_monte, name, mode, count, seed, expected,
+                            engine)))
+
+        for (n, future) in futures:
+            result = future.result()
+            passed += n - len(result)
+            failures += result
+    return (passed, failures, skipped)
+
+
+#-------------------------------------------------------------------
+# _write_rsp()
+#
+# Write a response file in the CAVP format with digests from
+# hashlib, for the self tests.
+#-------------------------------------------------------------------
+def _write_rsp(path, mode, messages = None, seed = None, checkpoints = 0):
+    digest_size = hashlib.new(mode).digest_size
+    with open(path, "w") as f:
+        f.write("#  CAVS 11.0\n#  generated for the self test\n\n")
+        f.write("[L = %d]\n\n" % digest_size)
+        if seed is not None:
+            f.write("Seed = %s\n\n" % seed.hex())
+            for count in range(checkpoints):
+                md = [seed, seed, seed]
+                for i in range(MONTE_ITERATIONS):
+                    md = [md[1], md[2], hashlib.new(mode, b"".join(md)).digest()]
+                seed = md[2]
+                f.write("COUNT = %d\nMD = %s\n\n" % (count, seed.hex()))
+            return
+
+        for message in messages:
+            f.write("Len = %d\nMsg = %s\nMD = %s\n\n" %
+                    (8 * len(message), (message or b"\x00").hex(),
+                     hashlib.new(mode, message).hexdigest()))
+
+
+#-------------------------------------------------------------------
+# cavp_tests()
+#
+# Generate small short message and Monte Carlo files with
+# hashlib, check that they pass with both engines, then corrupt
+# one digest and check that exactly that case fails with both.
+# Also checks a bit oriented vector from the SHAVS document.
+#-------------------------------------------------------------------
+def cavp_tests():
+    print("Running CAVP runner tests:")
+    errors = 0
+    messages = [os.urandom(n) for n in [0, 1, 55, 56, 63, 64, 65, 119, 120, 300]]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for mode in ["sha224", "sha256"]:
+            _write_rsp(os.path.join(tmp_dir, "%sShortMsg.rsp" % mode.upper()),
+                       mode, messages=messages)
+            _write_rsp(os.path.join(tmp_dir, "%sMonte.rsp" % mode.upper()),
+                       mode, seed=os.urandom(hashlib.new(mode).digest_size),
+                       checkpoints=2)
+        with open(os.path.join(tmp_dir, "SHA1ShortMsg.rsp"), "w") as f:
+            f.write("[L = 20]\n\nLen = 0\nMsg = 00\nMD = %s\n" %
+                    hashlib.sha1().hexdigest())
+
+        (passed, failures, skipped) = run_cavp([tmp_dir])
+        if (passed != 2 * len(ENGINES) * (len(messages) + 2)) or failures:
+            print("Error: %d passed, failures: %s" % (passed, failures))
+            errors += 1
+        if skipped != ["SHA1ShortMsg.rsp"]:
+            print("Error: skipped %s, expected the SHA-1 file." % skipped)
+            errors += 1
+
+        path = os.path.join(tmp_dir, "SHA256ShortMsg.rsp")
+        with open(path) as f:
+            lines = f.read().split("\n")
+        i = lines.index("Len = 440")
+        lines[i + 2] = lines[i + 2][:-1] + ("0" if lines[i + 2][-1] != "0" else "1")
+        with open(path, "w") as f:
+            f.write("\n".join(lines))
+        (passed, failures, skipped) = run_cavp([path], jobs=1)
+        expected = ["SHA256ShortMsg.rsp: Len = 440 failed, %s engine." % engine
+                    for engine in ENGINES]
+        if failures != expected:
+            print("Error: expected Len = 440 to fail, got %s." % failures)
+            errors += 1
+        (passed, failures, skipped) = run_cavp([path], jobs=1, engines=["fast"])
+        if (passed != len(messages) - 1) or (failures != expected[1:]):
+            print("Error: fast engine only gave %d passed, %s." % (passed, failures))
+            errors += 1
+
+    # Bit oriented SHA-256 vector: the 5 bit message 0b01101.
+    expected = "d6d3e02a31a84a8caa9718ed6c2057be09db45e7823eb5079ce7a573a3760f95"
+    for (engine, fast) in ENGINES.items():
+        my_sha256 = SHA256(mode="sha256", fast=fast)
+        if model_digest(my_sha256, bytes([0x68]), 5).hex() != expected:
+            print("Error: bit oriented vector failed, %s engine." % engine)
+            errors += 1
+
+    if errors == 0:
+        print("Test case ok.")
+    print("")
+
+
+#-------------------------------------------------------------------
+# main()
+#
+# Run the vectors in the given files and directories, or the
+# self tests if none are given.
+#-------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Run NIST CAVP SHA-224 and "
+                                     "SHA-256 vectors on the model.")
+    parser.add_argument("paths", nargs="*")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="number of worker processes (default: all CPUs)")
+    parser.add_argument("--engine", choices=list(ENGINES) + ["both"],
+                        default="both",
+                        help="model engine to check (default: both)")
+    args = parser.parse_args()
+
+    if not args.paths:
+        cavp_tests()
+        return 0
+
+    engines = list(ENGINES) if args.engine == "both" else [args.engine]
+    start = time.perf_counter()
+    (passed, failures, skipped) = run_cavp(args.paths, args.jobs, engines)
+    for failure in failures:
+        print(failure)
+    print("CAVP: %d passed, %d failed, %d files skipped in %.1f s: %s" %
+          (passed, len(failures), len(skipped), time.perf_counter() - start,
+           "FAIL" if failures else "PASS"))
+    return 1 if failures else 0
+
+
+#-------------------------------------------------------------------
+# __name__
+# Python thingy which allows the file to be run standalone as
+# well as parsed from within a Python interpreter.
+#-------------------------------------------------------------------
+if __name__=="__main__":
+    # Run the main function.
+    sys.exit(main())
+
+#=======================================================================
+# EOF sha256_cavp.py
+#=======================================================================
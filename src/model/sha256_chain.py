@@ -0,0 +1,174 @@
+#-------------------------------------------------------------------
+# sha256_chain.py
+#
+# Chaining value sidecar for stream simulation triage. Hashes a
+# file with the model, padding it on the fly, and writes the
+# chaining value after every N blocks (and always after the last
+# block) to <file>.chain.
+#
+# Each record is 36 bytes: the number of blocks digested so far
+# as a 32 bit big endian int, followed by the 256 bit chaining
+# value H0..H7 as big endian words, the same bit order as the
+# digest_o port of the core. A Verilog testbench can read one
+# record at a time with $fread into a [287:0] register, see
+# tb_sha256_stream (+chain=<file>.chain).
+#
+# Usage:
+#   python sha256_chain.py [--mode sha224|sha256] [--interval N]
+#                          [--out CHAIN] FILE
+#   python sha256_chain.py            (runs the self tests)
+#-------------------------------------------------------------------
+
+#-------------------------------------------------------------------
+# Python module imports.
+#-------------------------------------------------------------------
+import os
+import sys
+import struct
+import hashlib
+import argparse
+import tempfile
+from sha256 import SHA256
+from sha256_padder import pad_blocks, padded_blocks
+from sha256_codec import digest_to_bytes
+
+
+#-------------------------------------------------------------------
+# Constants.
+#-------------------------------------------------------------------
+CHAIN_SUFFIX = ".chain"
+CHAIN_STRUCT = struct.Struct(">I8I")
+
+
+#-------------------------------------------------------------------
+# write_chain()
+#
+# Hash the file at path and write the chaining value records.
+# Returns the number of blocks and records.
+#-------------------------------------------------------------------
+def write_chain(path, chain_path = None, mode = "sha256", interval = 1):
+    if chain_path is None:
+        chain_path = path + CHAIN_SUFFIX
+    total = padded_blocks(os.path.getsize(path))
+
+    my_sha256 = SHA256(mode=mode, fast=True)
+    my_sha256.init()
+    records = 0
+    with open(path, "rb") as f, open(chain_path, "wb") as out:
+        for block in pad_blocks(f):
+            my_sha256.next(block)
+            n = my_sha256.blocks
+            if (n % interval == 0) or (n == total):
+                out.write(CHAIN_STRUCT.pack(n, *my_sha256.get_digest()))
+                records += 1
+    return (total, records)
+
+
+#-------------------------------------------------------------------
+# read_chain()
+#
+# Returns the list of (blocks, H) records of a chain file.
+#-------------------------------------------------------------------
+def read_chain(chain_path):
+    with open(chain_path, "rb") as f:
+        data = f.read()
+    return [(record[0], list(record[1:]))
+            for record in CHAIN_STRUCT.iter_unpack(data)]
+
+
+#-------------------------------------------------------------------
+# first_divergence()
+#
+# Compare a chain file to the chaining values seen in a
+# simulation, given as a list with the value after each block
+# (for example parsed from a log). Returns the first record
+# (blocks, expected H) that does not match, or None.
+#-------------------------------------------------------------------
+def first_divergence(chain_path, values):
+    for (n, H) in read_chain(chain_path):
+        if (n > len(values)) or (list(values[n - 1]) != H):
+            return (n, H)
+    return None
+
+
+#-------------------------------------------------------------------
+# chain_tests()
+#
+# Write chains for files of different lengths and intervals,
+# check the record positions and that the last record is the
+# digest from hashlib, then check that a corrupted value is
+# found.
+#-------------------------------------------------------------------
+def chain_tests():
+    print("Running chaining value sidecar tests:")
+    errors = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "stream.bin")
+        for (length, interval) in [(0, 1), (55, 1), (56, 1), (1000, 1),
+                                   (1000, 4), (1000, 100)]:
+            data = os.urandom(length)
+            with open(path, "wb") as f:
+                f.write(data)
+            (total, records) = write_chain(path, interval=interval)
+            chain = read_chain(path + CHAIN_SUFFIX)
+            expected = [n for n in range(1, total + 1)
+                        if (n % interval == 0) or (n == total)]
+            if ([n for (n, H) in chain] != expected) or (records != len(expected)):
+                print("Error: length %d, interval %d: wrong records." %
+                      (length, interval))
+                errors += 1
+            if digest_to_bytes(chain[-1][1]) != hashlib.sha256(data).digest():
+                print("Error: length %d: last record is not the digest." % length)
+                errors += 1
+
+        write_chain(path, interval=1)
+        values = [H for (n, H) in read_chain(path + CHAIN_SUFFIX)]
+        if first_divergence(path + CHAIN_SUFFIX, values) is not None:
+            print("Error: divergence found in an identical chain.")
+            errors += 1
+        values[7] = [values[7][0] ^ 1] + values[7][1:]
+        result = first_divergence(path + CHAIN_SUFFIX, values)
+        if (result is None) or (result[0] != 8):
+            print("Error: expected divergence at block 8, got %s." % (result,))
+            errors += 1
+
+    if errors == 0:
+        print("Test case ok.")
+    print("")
+
+
+#-------------------------------------------------------------------
+# main()
+#-------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Write the model chaining "
+                                     "values of a file for stream simulations.")
+    parser.add_argument("file", nargs="?")
+    parser.add_argument("--mode", choices=["sha224", "sha256"], default="sha256")
+    parser.add_argument("--interval", type=int, default=1,
+                        help="blocks between chaining values")
+    parser.add_argument("--out", default=None,
+                        help="chain file (default <file>%s)" % CHAIN_SUFFIX)
+    args = parser.parse_args()
+
+    if args.file is None:
+        chain_tests()
+        return 0
+
+    (total, records) = write_chain(args.file, args.out, args.mode, args.interval)
+    print("%d blocks, %d chaining values written." % (total, records))
+    return 0
+
+
+#-------------------------------------------------------------------
+# __name__
+# Python thingy which allows the file to be run standalone as
+# well as parsed from within a Python interpreter.
+#-------------------------------------------------------------------
+if __name__=="__main__":
+    # Run the main function.
+    sys.exit(main())
+
+#=======================================================================
+# EOF sha256_chain.py
+#=======================================================================
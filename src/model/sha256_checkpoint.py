@@ -0,0 +1,296 @@
+#-------------------------------------------------------------------
+# sha256_checkpoint.py
+#
+# Midstate checkpoint index for hashing large append-only files
+# with the SHA256 model. A sidecar index (<file>.sha256idx)
+# stores the model midstate every N blocks together with the
+# file offset and a CRC32 of the blocks since the previous
+# checkpoint.
+#
+# When the file is hashed again the index is validated against
+# the file size and mtime. If both match, all checkpoints are
+# used as is. Otherwise the checkpoints are checked in order
+# with their CRC32 and hashing resumes from the last one that
+# still matches the file. After an append this is the last
+# checkpoint, after an edit it is the nearest one before the
+# change.
+#
+# The index is a fixed size header followed by fixed size
+# records and is read through mmap.
+#-------------------------------------------------------------------
+
+#-------------------------------------------------------------------
+# Python module imports.
+#-------------------------------------------------------------------
+import os
+import sys
+import mmap
+import zlib
+import struct
+import hashlib
+import argparse
+import tempfile
+import threading
+from sha256_hasher import get_class
+
+
+#-------------------------------------------------------------------
+# Constants.
+#-------------------------------------------------------------------
+BLOCK_SIZE = 64
+INDEX_SUFFIX = ".sha256idx"
+INDEX_MAGIC = b"S256IDX1"
+DEFAULT_INTERVAL = 1024
+
+# magic, mode bit, interval (blocks), file size, mtime (ns), records.
+HEADER_STRUCT = struct.Struct(">8sB3xIQQI")
+
+# offset, crc32 of the segment ending at offset, H[0..7].
+RECORD_STRUCT = struct.Struct(">QI8I")
+
+
+#-------------------------------------------------------------------
+# CheckpointIndex()
+#
+# In memory view of an index file. checkpoints is a list of
+# (offset, crc, H) tuples in file order.
+#-------------------------------------------------------------------
+class CheckpointIndex():
+    def __init__(self, mode = "sha256", interval = DEFAULT_INTERVAL):
+        self.mode = mode
+        self.interval = interval
+        self.file_size = 0
+        self.mtime_ns = 0
+        self.checkpoints = []
+
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size < HEADER_STRUCT.size:
+                    return None
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return cls._parse(mm)
+        except OSError:
+            return None
+
+
+    @classmethod
+    def _parse(cls, mm):
+        (magic, mode_bit, interval, file_size, mtime_ns,
+         n) = HEADER_STRUCT.unpack_from(mm, 0)
+        if magic != INDEX_MAGIC:
+            return None
+        if len(mm) != HEADER_STRUCT.size + n * RECORD_STRUCT.size:
+            return None
+
+        index = cls(["sha224", "sha256"][mode_bit], interval)
+        index.file_size = file_size
+        index.mtime_ns = mtime_ns
+        for i in range(n):
+            record = RECORD_STRUCT.unpack_from(mm, HEADER_STRUCT.size +
+                                               i * RECORD_STRUCT.size)
+            index.checkpoints.append((record[0], record[1], list(record[2:])))
+        return index
+
+
+    def save(self, path):
+        data = bytearray(HEADER_STRUCT.pack(INDEX_MAGIC,
+                                            int(self.mode == "sha256"),
+                                            self.interval, self.file_size,
+                                            self.mtime_ns,
+                                            len(self.checkpoints)))
+        for (offset, crc, H) in self.checkpoints:
+            data += RECORD_STRUCT.pack(offset, crc, *H)
+
+        # Write to a temporary file first so that a reader never
+        # sees a partially written index. Each writer gets its own
+        # temporary file in the same directory, so concurrent
+        # writers do not collide and the last replace wins.
+        f = tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or ".",
+                                        prefix=os.path.basename(path) + ".",
+                                        suffix=".tmp", delete=False)
+        try:
+            with f:
+                f.write(data)
+            os.replace(f.name, path)
+        except BaseException:
+            os.unlink(f.name)
+            raise
+
+
+#-------------------------------------------------------------------
+# hash_file()
+#
+# Hash the given file with the model, using and updating the
+# checkpoint index. Returns the hex digest and the number of
+# bytes that had to be hashed.
+#-------------------------------------------------------------------
+def hash_file(path, mode = "sha256", interval = DEFAULT_INTERVAL,
+              index_path = None):
+    if index_path is None:
+        index_path = path + INDEX_SUFFIX
+
+    st = os.stat(path)
+    size = st.st_size
+    index = CheckpointIndex.load(index_path)
+    if (index is None) or (index.mode != mode) or (index.interval != interval):
+        index = CheckpointIndex(mode, interval)
+
+    unchanged = ((index.file_size == size) and
+                 (index.mtime_ns == st.st_mtime_ns))
+    with open(path, "rb") as f:
+        if size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                (digest, start) = _hash_data(mm, index, unchanged)
+        else:
+            (digest, start) = _hash_data(b"", index, unchanged)
+
+    index.file_size = size
+    index.mtime_ns = st.st_mtime_ns
+    index.save(index_path)
+    return (digest, size - start)
+
+
+#-------------------------------------------------------------------
+# _hash_data()
+#
+# Validate the checkpoints of the index against the data, then
+# hash from the last valid checkpoint, adding new checkpoints.
+# All memoryview slices of the data are released on return so
+# that the caller can close the mmap.
+#-------------------------------------------------------------------
+def _hash_data(buf, index, unchanged):
+    data = memoryview(buf)
+    size = len(data)
+    segment_size = index.interval * BLOCK_SIZE
+
+    valid = 0
+    for (offset, crc, H) in index.checkpoints:
+        if offset > size:
+            break
+        if ((not unchanged) and
+            (zlib.crc32(data[offset - segment_size : offset]) != crc)):
+            break
+        valid += 1
+    index.checkpoints = index.checkpoints[:valid]
+
+    if index.checkpoints:
+        (offset, crc, H) = index.checkpoints[-1]
+        state = {"mode" : index.mode, "H" : H, "blocks" : offset // BLOCK_SIZE}
+        hasher = get_class(index.mode).resume(state)
+    else:
+        offset = 0
+        hasher = get_class(index.mode)()
+    start = offset
+
+    while offset + segment_size <= size:
+        segment = data[offset : offset + segment_size]
+        hasher.update(segment)
+        offset += segment_size
+        index.checkpoints.append((offset, zlib.crc32(segment),
+                                  hasher.export_state()["H"]))
+    hasher.update(data[offset:])
+    return (hasher.hexdigest(), start)
+
+
+#-------------------------------------------------------------------
+# checkpoint_tests()
+#
+# Hash a file, append to it, edit it and truncate it, and check
+# the digests against hashlib and how much had to be rehashed.
+# Then save the index from several threads at once.
+#-------------------------------------------------------------------
+def checkpoint_tests():
+    print("Running checkpoint index tests:")
+    errors = 0
+    interval = 4
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "capture.bin")
+        content = bytearray(os.urandom(BLOCK_SIZE * 21 + 13))
+
+        def check(name, max_hashed):
+            with open(path, "wb") as f:
+                f.write(content)
+            (digest, hashed) = hash_file(path, interval=interval)
+            if digest != hashlib.sha256(content).hexdigest():
+                print("Error: %s digest mismatch." % name)
+                return 1
+            if hashed > max_hashed:
+                print("Error: %s hashed %d bytes, expected at most %d." %
+                      (name, hashed, max_hashed))
+                return 1
+            return 0
+
+        segment_size = interval * BLOCK_SIZE
+        errors += check("first hash", len(content))
+        old_size = len(content)
+        content += os.urandom(BLOCK_SIZE * 9)
+        errors += check("append",
+                        len(content) - (old_size // segment_size) * segment_size)
+        content[BLOCK_SIZE * 17] ^= 0xff
+        errors += check("edit", len(content) - 16 * BLOCK_SIZE)
+        del content[BLOCK_SIZE * 6:]
+        errors += check("truncate", BLOCK_SIZE * 2)
+        content = bytearray()
+        errors += check("empty", 0)
+
+        index_path = path + INDEX_SUFFIX
+        index = CheckpointIndex.load(index_path)
+        def save_many():
+            for i in range(20):
+                index.save(index_path)
+        threads = [threading.Thread(target=save_many) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        expected = sorted([os.path.basename(path), os.path.basename(index_path)])
+        if ((CheckpointIndex.load(index_path) is None) or
+            (sorted(os.listdir(tmp_dir)) != expected)):
+            print("Error: concurrent saves left %s." % os.listdir(tmp_dir))
+            errors += 1
+
+    if errors == 0:
+        print("Test case ok.")
+    print("")
+
+
+#-------------------------------------------------------------------
+# main()
+#
+# Hash the files given on the command line using the index,
+# or run the self tests if no files are given.
+#-------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Hash append-only files "
+                                     "with the model using a midstate index.")
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--mode", choices=["sha224", "sha256"], default="sha256")
+    parser.add_argument("--interval", type=int, default=DEFAULT_INTERVAL,
+                        help="blocks between checkpoints")
+    args = parser.parse_args()
+
+    if not args.files:
+        checkpoint_tests()
+        return 0
+
+    for path in args.files:
+        (digest, hashed) = hash_file(path, args.mode, args.interval)
+        print("%s  %s  (%d bytes hashed)" % (digest, path, hashed))
+    return 0
+
+
+#-------------------------------------------------------------------
+# __name__
+# Python thingy which allows the file to be run standalone as
+# well as parsed from within a Python interpreter.
+#-------------------------------------------------------------------
+if __name__=="__main__":
+    # Run the main function.
+    sys.exit(main())
+
+#=======================================================================
+# EOF sha256_checkpoint.py
+#=======================================================================
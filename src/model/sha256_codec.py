@@ -0,0 +1,130 @@
+#-------------------------------------------------------------------
+# sha256_codec.py
+#
+# Conversion between the forms a 512 bit block and a digest
+# take in the model, the testbenches and the scoreboard:
+# a big endian int (as on the core's block and digest ports),
+# bytes-like objects and lists of 32 bit words.
+#
+# All conversions go through int.to_bytes()/int.from_bytes()
+# and struct, never through hex strings, so leading zero words
+# are kept.
+#-------------------------------------------------------------------
+
+#-------------------------------------------------------------------
+# Python module imports.
+#-------------------------------------------------------------------
+import struct
+
+
+#-------------------------------------------------------------------
+# Constants.
+#-------------------------------------------------------------------
+BLOCK_BYTES = 64
+BLOCK_STRUCT = struct.Struct(">16I")
+DIGEST_STRUCT = struct.Struct(">8I")
+
+
+#-------------------------------------------------------------------
+# block_to_words()
+#
+# Convert a block given as a 512 bit int, a 64 byte bytes-like
+# object or a sequence of 16 words to a tuple of 16 words.
+#-------------------------------------------------------------------
+def block_to_words(block):
+    if isinstance(block, int):
+        if (block < 0) or (block >> 512):
+            raise ValueError("Block int does not fit in 512 bits.")
+        return BLOCK_STRUCT.unpack(block.to_bytes(BLOCK_BYTES, "big"))
+
+    if isinstance(block, (bytes, bytearray, memoryview)):
+        if len(block) != BLOCK_BYTES:
+            raise ValueError("Expected a %d byte block, got %d bytes." %
+                             (BLOCK_BYTES, len(block)))
+        return BLOCK_STRUCT.unpack(block)
+
+    words = tuple(block)
+    check_words(words)
+    return words
+
+
+#-------------------------------------------------------------------
+# check_words()
+#
+# Raise ValueError unless words is a sequence of 16 ints that
+# fit in 32 bits. Used for blocks given as a list or tuple,
+# which the model takes without converting them.
+#-------------------------------------------------------------------
+def check_words(words):
+    if len(words) != 16:
+        raise ValueError("Expected a 16 word block, got %d words." % len(words))
+    try:
+        BLOCK_STRUCT.pack(*words)
+    except struct.error as e:
+        raise ValueError("Invalid block word: %s." % e) from None
+
+
+#-------------------------------------------------------------------
+# words_to_int()
+# words_to_bytes()
+#
+# Convert 16 block words (or 7/8 digest words) to a big
+# endian int or to bytes.
+#-------------------------------------------------------------------
+def words_to_int(words):
+    return int.from_bytes(words_to_bytes(words), "big")
+
+
+def words_to_bytes(words):
+    return struct.pack(">%dI" % len(words), *words)
+
+
+#-------------------------------------------------------------------
+# block_to_int()
+# block_to_bytes()
+#
+# Convert a block in any of the supported forms to a 512 bit
+# int or to 64 bytes.
+#-------------------------------------------------------------------
+def block_to_int(block):
+    if isinstance(block, int):
+        return block
+    return int.from_bytes(block_to_bytes(block), "big")
+
+
+def block_to_bytes(block):
+    if isinstance(block, (bytes, bytearray, memoryview)):
+        return bytes(block)
+    if isinstance(block, int):
+        return block.to_bytes(BLOCK_BYTES, "big")
+    return BLOCK_STRUCT.pack(*block_to_words(block))
+
+
+#-------------------------------------------------------------------
+# digest_to_int()
+# digest_to_bytes()
+# digest_to_hex()
+# int_to_digest()
+#
+# Convert between the model digest (list of words) and a big
+# endian int, bytes or hex string. length is the number of
+# digest words to use, 7 for SHA-224.
+#-------------------------------------------------------------------
+def digest_to_int(digest, length = 8):
+    return int.from_bytes(digest_to_bytes(digest, length), "big")
+
+
+def digest_to_bytes(digest, length = 8):
+    return struct.pack(">%dI" % length, *digest[:length])
+
+
+def digest_to_hex(digest, length = 8):
+    return digest_to_bytes(digest, length).hex()
+
+
+def int_to_digest(value, length = 8):
+    return list(struct.unpack(">%dI" % length, value.to_bytes(4 * length, "big")))
+
+#=======================================================================
+# EOF sha256_codec.py
+#=======================================================================
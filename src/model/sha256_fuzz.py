@@ -0,0 +1,290 @@
+#-------------------------------------------------------------------
+# sha256_fuzz.py
+#
+# Differential fuzzer for the SHA256 model. Random messages of
+# random length, biased towards the lengths where padding
+# changes (55, 56, 63, 64 bytes modulo 64), are hashed with the
+# model and with hashlib in a pool of worker processes. Every
+# message goes through the hashlib like interface and through
+# both engines of the model, the round engine (the SHA256()
+# default) and the fast engine, so a bug in either one is found.
+#
+# At most MAX_FAILURES failures are kept over all jobs, the fuzz
+# stops once that many are found, and only those are shrunk.
+#
+# A failing message is shrunk to a minimal failing message by
+# removing chunks of bytes and then zeroing bytes. The block
+# index reported is the first block where the fast engine and
+# the round engine of the model disagree, or the last block of
+# the padded message if they agree with each other.
+#
+# Usage:
+#   python sha256_fuzz.py [--jobs N] [--seconds S | --messages N]
+#                         [--max-len BYTES] [--seed SEED]
+#   python sha256_fuzz.py --test    (runs the self tests)
+#-------------------------------------------------------------------
+
+#-------------------------------------------------------------------
+# Python module imports.
+#-------------------------------------------------------------------
+import os
+import sys
+import time
+import random
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from sha256 import SHA256
+from sha256_cavp import message_blocks, model_digest
+import sha256_hasher
+
+
+#-------------------------------------------------------------------
+# Constants.
+#-------------------------------------------------------------------
+MODES = ["sha224", "sha256"]
+BOUNDARY_OFFSETS = [0, 1, 55, 56, 57, 63]
+MESSAGES_PER_JOB = 500
+MAX_FAILURES = 4
+
+
+#-------------------------------------------------------------------
+# random_message()
+#
+# Half of the messages have a length close to a padding
+# boundary, the other half a uniform length up to max_len.
+#-------------------------------------------------------------------
+def random_message(rng, max_len):
+    if rng.random() < 0.5:
+        length = 64 * rng.randint(0, max_len // 64) + rng.choice(BOUNDARY_OFFSETS)
+        length = min(length, max_len)
+    else:
+        length = rng.randint(0, max_len)
+    return rng.getrandbits(8 * length).to_bytes(length, "big")
+
+
+#-------------------------------------------------------------------
+# model_fails()
+#
+# True if the hashlib like interface or either engine of the
+# model gives a different digest than hashlib.
+#-------------------------------------------------------------------
+def model_fails(mode, message):
+    expected = hashlib.new(mode, message).digest()
+    if sha256_hasher.new(mode, message).digest() != expected:
+        return True
+    for my_sha256 in [SHA256(mode=mode), SHA256(mode=mode, fast=True)]:
+        if model_digest(my_sha256, message, 8 * len(message)) != expected:
+            return True
+    return False
+
+
+#-------------------------------------------------------------------
+# shrink()
+#
+# Shrink a message for which fails(message) is true to a
+# smaller message for which it is still true. First removes
+# chunks of halving size, then sets bytes to zero.
+#-------------------------------------------------------------------
+def shrink(message, fails):
+    message = bytes(message)
+    chunk = len(message) // 2
+    while chunk > 0:
+        i = 0
+        while i < len(message):
+            candidate = message[:i] + message[i + chunk:]
+            if fails(candidate):
+                message = candidate
+            else:
+                i += chunk
+        chunk //= 2
+
+    for i in range(len(message)):
+        if message[i] != 0:
+            candidate = message[:i] + b"\x00" + message[i + 1:]
+            if fails(candidate):
+                message = candidate
+    return message
+
+
+#-------------------------------------------------------------------
+# failing_block()
+#
+# Index of the first block of the padded message where the fast
+# and the round engine of the model disagree. If they agree all
+# the way, the index of the last block.
+#-------------------------------------------------------------------
+def failing_block(mode, message):
+    blocks = message_blocks(message, 8 * len(message))
+    fast_sha = SHA256(mode=mode, fast=True)
+    round_sha = SHA256(mode=mode, fast=False)
+    fast_sha.init()
+    round_sha.init()
+    for (i, block) in enumerate(blocks):
+        fast_sha.next(block)
+        round_sha.next(block)
+        if fast_sha.get_digest() != round_sha.get_digest():
+            return i
+    return len(blocks) - 1
+
+
+#-------------------------------------------------------------------
+# _fuzz_job()
+#
+# Process pool job. Hashes count messages generated from seed
+# and returns (count, bytes hashed, failures) where failures is
+# a list of at most max_failures (mode, message).
+#-------------------------------------------------------------------
+def _fuzz_job(seed, count, max_len, max_failures = MAX_FAILURES):
+    rng = random.Random(seed)
+    total = 0
+    failures = []
+    for i in range(count):
+        mode = rng.choice(MODES)
+        message = random_message(rng, max_len)
+        total += len(message)
+        if (len(failures) < max_failures) and model_fails(mode, message):
+            failures.append((mode, message))
+    return (count, total, failures)
+
+
+#-------------------------------------------------------------------
+# fuzz()
+#
+# Run fuzz jobs in a process pool until the time or message
+# budget is used up, or until max_failures failures are found.
+# The last job is sized to the messages left, so exactly
+# messages messages are hashed. Returns (messages, bytes,
+# seconds, failures).
+#-------------------------------------------------------------------
+def fuzz(jobs = None, seconds = 10.0, messages = None, max_len = 1024,
+         seed = None, max_failures = MAX_FAILURES):
+    if seed is None:
+        seed = random.getrandbits(64)
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    done = 0
+    submitted = 0
+    total = 0
+    failures = []
+    next_seed = seed
+    start = time.perf_counter()
+
+    def job_size():
+        if len(failures) >= max_failures:
+            return 0
+        if messages is not None:
+            return min(MESSAGES_PER_JOB, messages - submitted)
+        if time.perf_counter() - start < seconds:
+            return MESSAGES_PER_JOB
+        return 0
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = []
+        while True:
+            while (len(pending) < 2 * jobs) and (job_size() > 0):
+                count = job_size()
+                pending.append(executor.submit(_fuzz_job, next_seed, count,
+                                               max_len, max_failures))
+                submitted += count
+                next_seed += 1
+            if not pending:
+                break
+            (count, size, job_failures) = pending.pop(0).result()
+            done += count
+            total += size
+            failures += job_failures[:max_failures - len(failures)]
+            if len(failures) >= max_failures:
+                for future in pending:
+                    future.cancel()
+                break
+    return (done, total, time.perf_counter() - start, failures)
+
+
+#-------------------------------------------------------------------
+# fuzz_tests()
+#
+# Check that shrink() finds the minimal message for a fault
+# injected by a fake predicate, that failing_block() indexes
+# the padded blocks, and run a short fuzz.
+#-------------------------------------------------------------------
+def fuzz_tests():
+    print("Running differential fuzzer tests:")
+    errors = 0
+
+    # Fault: any message of at least 70 bytes containing 0xab.
+    def fails(message):
+        return (len(message) >= 70) and (b"\xab" in message)
+
+    message = os.urandom(300) + b"\xab" + os.urandom(300)
+    shrunk = shrink(message, fails)
+    if (len(shrunk) != 70) or (shrunk.count(0xab) != 1) or (shrunk.count(0) != 69):
+        print("Error: shrink() gave %s." % shrunk.hex())
+        errors += 1
+
+    if (failing_block("sha256", b"") != 0) or (failing_block("sha256", bytes(56)) != 1):
+        print("Error: failing_block() did not index the padding block.")
+        errors += 1
+
+    (done, total, seconds, failures) = fuzz(jobs=1, messages=1234, max_len=300)
+    if (done != 1234) or failures:
+        print("Error: fuzzed %d messages, %d failures." % (done, len(failures)))
+        errors += 1
+
+    if errors == 0:
+        print("Test case ok.")
+    print("")
+
+
+#-------------------------------------------------------------------
+# main()
+#-------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Differential fuzzer for the "
+                                     "SHA256 model against hashlib.")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="number of worker processes (default: all CPUs)")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--messages", type=int, default=None,
+                        help="number of messages, instead of --seconds")
+    parser.add_argument("--max-len", type=int, default=1024,
+                        help="maximum message length in bytes")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--test", action="store_true",
+                        help="run the self tests")
+    args = parser.parse_args()
+
+    if args.test:
+        fuzz_tests()
+        return 0
+
+    seed = args.seed if args.seed is not None else random.getrandbits(64)
+    print("Fuzzing the SHA256 model against hashlib, seed %d:" % seed)
+    (done, total, seconds, failures) = fuzz(args.jobs, args.seconds,
+                                            args.messages, args.max_len, seed)
+    print("%d messages, %d bytes in %.1f s: %.1f messages/s, %.3f MB/s" %
+          (done, total, seconds, done / seconds, total / seconds / 1e6))
+    if len(failures) >= MAX_FAILURES:
+        print("Stopped after %d failures." % len(failures))
+
+    for (mode, message) in failures:
+        shrunk = shrink(message, lambda m: model_fails(mode, m))
+        print("Error: %s mismatch, %d byte message shrunk to %d bytes, "
+              "block %d: %s" % (mode, len(message), len(shrunk),
+                                failing_block(mode, shrunk), shrunk.hex()))
+    return 1 if failures else 0
+
+
+#-------------------------------------------------------------------
+# __name__
+# Python thingy which allows the file to be run standalone as
+# well as parsed from within a Python interpreter.
+#-------------------------------------------------------------------
+if __name__=="__main__":
+    # Run the main function.
+    sys.exit(main())
+
+#=======================================================================
+# EOF sha256_fuzz.py
+#=======================================================================
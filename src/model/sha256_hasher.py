@@ -0,0 +1,178 @@
+#-------------------------------------------------------------------
+# sha256_hasher.py
+#
+# hashlib compatible streaming hasher built on the SHA256 model.
+# The objects buffer input internally, pad the final block
+# automatically and feed full blocks to the model directly from
+# memoryview slices.
+#-------------------------------------------------------------------
+
+#-------------------------------------------------------------------
+# Python module imports.
+#-------------------------------------------------------------------
+import sys
+import hashlib
+from sha256 import SHA256
+from sha256_codec import BLOCK_STRUCT, digest_to_bytes
+from sha256_padder import padding_tail
+
+
+#-------------------------------------------------------------------
+# sha256()
+#-------------------------------------------------------------------
+class sha256():
+    name = "sha256"
+    digest_size = 32
+    block_size = 64
+
+    def __init__(self, data = b""):
+        self._sha = SHA256(mode=self.name, fast=True)
+        self._sha.init()
+        self._buf = bytearray()
+        self._length = 0
+        if data:
+            self.update(data)
+
+
+    def update(self, data):
+        mv = memoryview(data).cast("B")
+        self._length += len(mv)
+        next_block = self._sha.next
+
+        if self._buf:
+            n = self.block_size - len(self._buf)
+            self._buf += mv[:n]
+            mv = mv[n:]
+            if len(self._buf) < self.block_size:
+                return
+            next_block(BLOCK_STRUCT.unpack(self._buf))
+            self._buf.clear()
+
+        end = len(mv) - (len(mv) % self.block_size)
+        for offset in range(0, end, self.block_size):
+            next_block(BLOCK_STRUCT.unpack_from(mv, offset))
+        self._buf += mv[end:]
+
+
+    # Continue hashing from a SHA256 midstate (see
+    # SHA256.export_state()). The message so far is the
+    # state's block count times the block size.
+    @classmethod
+    def resume(cls, state):
+        other = cls.__new__(cls)
+        other._sha = SHA256.from_state(state, fast=True)
+        other._buf = bytearray()
+        other._length = state["blocks"] * cls.block_size
+        return other
+
+
+    # Midstate of the underlying model. Only defined when all
+    # data so far fills complete blocks.
+    def export_state(self):
+        if self._buf:
+            raise ValueError("Hashed data does not end on a block boundary.")
+        return self._sha.export_state()
+
+
+    def copy(self):
+        other = self.__class__.__new__(self.__class__)
+        other._sha = self._sha.copy()
+        other._buf = bytearray(self._buf)
+        other._length = self._length
+        return other
+
+
+    def digest(self):
+        # Pad a copy so that the object can continue to be updated.
+        tail = padding_tail(self._length, self._buf)
+
+        sha = self._sha.copy()
+        for offset in range(0, len(tail), self.block_size):
+            sha.next(BLOCK_STRUCT.unpack_from(tail, offset))
+        return digest_to_bytes(sha.get_digest(), self.digest_size // 4)
+
+
+    def hexdigest(self):
+        return self.digest().hex()
+
+
+#-------------------------------------------------------------------
+# sha224()
+#-------------------------------------------------------------------
+class sha224(sha256):
+    name = "sha224"
+    digest_size = 28
+
+
+#-------------------------------------------------------------------
+# new()
+# get_class()
+#
+# Create a hasher object for the given mode name, like hashlib.new().
+# get_class() returns the hasher class for the mode name.
+#-------------------------------------------------------------------
+def new(name, data = b""):
+    return get_class(name)(data)
+
+
+def get_class(name):
+    if name == "sha256":
+        return sha256
+    elif name == "sha224":
+        return sha224
+    raise ValueError("Unsupported hash type %s" % name)
+
+
+#-------------------------------------------------------------------
+# hashlib_tests()
+#
+# Compare the hasher against hashlib for messages of different
+# lengths, fed in different chunk sizes.
+#-------------------------------------------------------------------
+def hashlib_tests():
+    print("Running hasher vs hashlib tests:")
+    message = bytes(range(256)) * 3
+    errors = 0
+    for name in ["sha224", "sha256"]:
+        for length in list(range(0, 130)) + [255, 256, 511, 767]:
+            for chunk in [1, 7, 64, 1000]:
+                my_hash = new(name)
+                for i in range(0, length, chunk):
+                    my_hash.update(message[i : min(i + chunk, length)])
+                if my_hash.hexdigest() != hashlib.new(name, message[:length]).hexdigest():
+                    print("Error: %s mismatch for length %d, chunk %d." %
+                          (name, length, chunk))
+                    errors += 1
+
+        my_hash = new(name, b"abc")
+        my_copy = my_hash.copy()
+        my_copy.update(b"def")
+        if ((my_hash.digest() != hashlib.new(name, b"abc").digest()) or
+            (my_copy.digest() != hashlib.new(name, b"abcdef").digest())):
+            print("Error: %s mismatch after copy." % name)
+            errors += 1
+
+    if errors == 0:
+        print("Test case ok.")
+    print("")
+
+
+#-------------------------------------------------------------------
+# main()
+#-------------------------------------------------------------------
+def main():
+    hashlib_tests()
+
+
+#-------------------------------------------------------------------
+# __name__
+# Python thingy which allows the file to be run standalone as
+# well as parsed from within a Python interpreter.
+#-------------------------------------------------------------------
+if __name__=="__main__":
+    # Run the main function.
+    sys.exit(main())
+
+#=======================================================================
+# EOF sha256_hasher.py
+#=======================================================================
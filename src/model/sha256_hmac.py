@@ -0,0 +1,265 @@
+#-------------------------------------------------------------------
+# sha256_hmac.py
+#
+# HMAC-SHA224/256 and PBKDF2-HMAC-SHA224/256 on the SHA256
+# model. The key is padded and XORed with ipad and opad once,
+# and the midstates after these two blocks are kept:
+#   - hmac objects start every message from the inner midstate
+#     and finish it from the outer midstate.
+#   - pbkdf2_hmac() runs every iteration as exactly two
+#     compressions, one from each midstate, with the padding of
+#     the fixed length inner and outer messages precomputed.
+#
+# Usage:
+#   python sha256_hmac.py           (runs the self tests)
+#   python sha256_hmac.py --bench   (iterations/s benchmark)
+#-------------------------------------------------------------------
+
+#-------------------------------------------------------------------
+# Python module imports.
+#-------------------------------------------------------------------
+import sys
+import time
+import struct
+import hmac as std_hmac
+import hashlib
+from sha256 import IV_SHA224, IV_SHA256
+from sha256 import get_fast_compress, get_fast_expand
+from sha256_codec import BLOCK_BYTES, BLOCK_STRUCT, words_to_bytes
+from sha256_padder import padding_words
+import sha256_hasher
+
+
+#-------------------------------------------------------------------
+# Constants.
+#-------------------------------------------------------------------
+IPAD = 0x36
+OPAD = 0x5c
+
+
+#-------------------------------------------------------------------
+# pad_midstates()
+#
+# The midstates after the ipad and the opad block of key.
+#-------------------------------------------------------------------
+def pad_midstates(key, mode = "sha256"):
+    if len(key) > BLOCK_BYTES:
+        key = sha256_hasher.new(mode, key).digest()
+    key = bytes(key).ljust(BLOCK_BYTES, b"\x00")
+
+    compress = get_fast_compress()
+    expand = get_fast_expand()
+    iv = IV_SHA256 if mode == "sha256" else IV_SHA224
+    H_ipad = compress(iv, expand(BLOCK_STRUCT.unpack(bytes(x ^ IPAD for x in key))))
+    H_opad = compress(iv, expand(BLOCK_STRUCT.unpack(bytes(x ^ OPAD for x in key))))
+    return (H_ipad, H_opad)
+
+
+#-------------------------------------------------------------------
+# hmac()
+#
+# hmac module compatible object. The pad midstates are computed
+# once in __init__, copy() shares them.
+#-------------------------------------------------------------------
+class hmac():
+    def __init__(self, key, msg = b"", digestmod = "sha256"):
+        cls = sha256_hasher.get_class(digestmod)
+        self.digest_size = cls.digest_size
+        self.block_size = cls.block_size
+        self.name = "hmac-" + cls.name
+        (H_ipad, H_opad) = pad_midstates(key, cls.name)
+        self._inner = cls.resume({"mode" : cls.name, "H" : H_ipad, "blocks" : 1})
+        self._outer = cls.resume({"mode" : cls.name, "H" : H_opad, "blocks" : 1})
+        if msg:
+            self.update(msg)
+
+
+    def update(self, msg):
+        self._inner.update(msg)
+
+
+    def copy(self):
+        other = self.__class__.__new__(self.__class__)
+        other.digest_size = self.digest_size
+        other.block_size = self.block_size
+        other.name = self.name
+        other._inner = self._inner.copy()
+        other._outer = self._outer
+        return other
+
+
+    def digest(self):
+        outer = self._outer.copy()
+        outer.update(self._inner.digest())
+        return outer.digest()
+
+
+    def hexdigest(self):
+        return self.digest().hex()
+
+
+#-------------------------------------------------------------------
+# new()
+#
+# Create an hmac object, like hmac.new().
+#-------------------------------------------------------------------
+def new(key, msg = b"", digestmod = "sha256"):
+    return hmac(key, msg, digestmod)
+
+
+#-------------------------------------------------------------------
+# pbkdf2_hmac()
+#
+# Same interface as hashlib.pbkdf2_hmac(). Every iteration is
+# one compression of U_j-1 from the ipad midstate and one of
+# the inner digest from the opad midstate. Both messages are
+# one block after a pad block, so their padding is constant.
+#-------------------------------------------------------------------
+def pbkdf2_hmac(hash_name, password, salt, iterations, dklen = None):
+    cls = sha256_hasher.get_class(hash_name)
+    n = cls.digest_size // 4
+    if dklen is None:
+        dklen = cls.digest_size
+    if (iterations < 1) or (dklen < 1):
+        raise ValueError("iterations and dklen must be at least 1.")
+
+    compress = get_fast_compress()
+    expand = get_fast_expand()
+    (H_ipad, H_opad) = pad_midstates(password, cls.name)
+    padding = padding_words(BLOCK_BYTES + 4 * n)
+
+    # The salt is hashed from the ipad midstate once.
+    salted = cls.resume({"mode" : cls.name, "H" : H_ipad, "blocks" : 1})
+    salted.update(salt)
+
+    key = b""
+    i = 1
+    while len(key) < dklen:
+        inner = salted.copy()
+        inner.update(i.to_bytes(4, "big"))
+        outer = cls.resume({"mode" : cls.name, "H" : H_opad, "blocks" : 1})
+        outer.update(inner.digest())
+        U = list(struct.unpack(">%dI" % n, outer.digest()))
+        T = U
+        for j in range(iterations - 1):
+            U = compress(H_ipad, expand(U + padding))[:n]
+            U = compress(H_opad, expand(U + padding))[:n]
+            T = [x ^ y for (x, y) in zip(T, U)]
+        key += words_to_bytes(T)
+        i += 1
+    return key[:dklen]
+
+
+#-------------------------------------------------------------------
+# _naive_pbkdf2_hmac()
+#
+# PBKDF2 with a full HMAC, four compressions, per iteration.
+# Only used as the benchmark reference.
+#-------------------------------------------------------------------
+def _naive_pbkdf2_hmac(hash_name, password, salt, iterations, dklen = None):
+    cls = sha256_hasher.get_class(hash_name)
+    if dklen is None:
+        dklen = cls.digest_size
+    key = bytes(password).ljust(BLOCK_BYTES, b"\x00")
+    ipad = bytes(x ^ IPAD for x in key)
+    opad = bytes(x ^ OPAD for x in key)
+
+    def naive_hmac(msg):
+        return cls(opad + cls(ipad + msg).digest()).digest()
+
+    result = b""
+    i = 1
+    while len(result) < dklen:
+        U = naive_hmac(salt + i.to_bytes(4, "big"))
+        T = U
+        for j in range(iterations - 1):
+            U = naive_hmac(U)
+            T = bytes(x ^ y for (x, y) in zip(T, U))
+        result += T
+        i += 1
+    return result[:dklen]
+
+
+#-------------------------------------------------------------------
+# hmac_tests()
+#
+# Compare HMAC with the hmac module and PBKDF2 with
+# hashlib.pbkdf2_hmac for different key, message and derived
+# key lengths in both modes.
+#-------------------------------------------------------------------
+def hmac_tests():
+    print("Running HMAC and PBKDF2 tests:")
+    errors = 0
+    data = bytes(range(256))
+    for mode in ["sha224", "sha256"]:
+        for key_len in [0, 1, 32, 63, 64, 65, 131]:
+            key = data[key_len : 2 * key_len]
+            for msg_len in [0, 1, 55, 64, 200]:
+                msg = data[:msg_len]
+                if (new(key, msg, mode).digest() !=
+                    std_hmac.new(key, msg, mode).digest()):
+                    print("Error: %s HMAC mismatch, key %d, message %d bytes." %
+                          (mode, key_len, msg_len))
+                    errors += 1
+
+            my_hmac = new(key, b"abc", mode)
+            my_copy = my_hmac.copy()
+            my_copy.update(b"def")
+            if ((my_hmac.digest() != std_hmac.new(key, b"abc", mode).digest()) or
+                (my_copy.digest() != std_hmac.new(key, b"abcdef", mode).digest())):
+                print("Error: %s HMAC mismatch after copy." % mode)
+                errors += 1
+
+        for (password, salt) in [(b"password", b"salt"), (b"", b""),
+                                 (data[:100], data[100:180])]:
+            for iterations in [1, 2, 100]:
+                for dklen in [None, 16, 33, 64]:
+                    if (pbkdf2_hmac(mode, password, salt, iterations, dklen) !=
+                        hashlib.pbkdf2_hmac(mode, password, salt, iterations,
+                                            dklen)):
+                        print("Error: %s PBKDF2 mismatch, %d iterations, "
+                              "dklen %s." % (mode, iterations, dklen))
+                        errors += 1
+
+    if errors == 0:
+        print("Test case ok.")
+    print("")
+
+
+#-------------------------------------------------------------------
+# pbkdf2_benchmark()
+#-------------------------------------------------------------------
+def pbkdf2_benchmark(iterations = 2000):
+    print("Running PBKDF2-HMAC-SHA256 benchmark:")
+    for (name, function) in [("naive", _naive_pbkdf2_hmac),
+                             ("midstate", pbkdf2_hmac)]:
+        start = time.perf_counter()
+        function("sha256", b"password", b"salt", iterations)
+        seconds = time.perf_counter() - start
+        print("%-8s %10.1f iterations/s" % (name, iterations / seconds))
+    print("")
+
+
+#-------------------------------------------------------------------
+# main()
+#-------------------------------------------------------------------
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--bench":
+        pbkdf2_benchmark()
+        return
+
+    hmac_tests()
+
+
+#-------------------------------------------------------------------
+# __name__
+# Python thingy which allows the file to be run standalone as
+# well as parsed from within a Python interpreter.
+#-------------------------------------------------------------------
+if __name__=="__main__":
+    # Run the main function.
+    sys.exit(main())
+
+#=======================================================================
+# EOF sha256_hmac.py
+#=======================================================================
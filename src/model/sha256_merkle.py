@@ -0,0 +1,303 @@
+#-------------------------------------------------------------------
+# sha256_merkle.py
+#
+# Merkle root engine on the SHA256 model. Leaves are the SHA-256
+# digests of the records, an interior node is the SHA-256 digest
+# of the 64 byte concatenation of its children. A node without a
+# right child (odd count on a level) is carried up unchanged.
+#
+# - Records are hashed in chunks of a power of two leaves in a
+#   process pool. Each worker also builds the levels of its
+#   chunk's subtree, so only the top of the tree is built in the
+#   main process.
+# - Interior nodes always hash two blocks: the children, then a
+#   constant padding block. The schedule of the padding block is
+#   computed once, so a node is one expansion and two
+#   compressions.
+# - MerkleTree keeps the leaves and caches interior nodes in a
+#   bounded LRU map, top levels first. update() invalidates the
+#   path of a changed leaf and re-roots using the cached
+#   siblings; evicted subtrees are recomputed from the leaves.
+#
+# Usage:
+#   python sha256_merkle.py            (runs the self tests)
+#   python sha256_merkle.py --bench    (leaves/s benchmark)
+#-------------------------------------------------------------------
+
+#-------------------------------------------------------------------
+# Python module imports.
+#-------------------------------------------------------------------
+import os
+import sys
+import time
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from sha256 import IV_SHA256
+from sha256 import get_fast_compress, get_fast_expand
+from sha256_codec import DIGEST_STRUCT, words_to_bytes
+from sha256_padder import padding_words
+import sha256_hasher
+
+
+#-------------------------------------------------------------------
+# Constants.
+#-------------------------------------------------------------------
+# Padding block of a 64 byte message.
+NODE_PADDING_BLOCK = padding_words(64)
+DEFAULT_CHUNK_SIZE = 1 << 10
+DEFAULT_CACHE_SIZE = 1 << 16
+
+_node_padding_schedule = None
+
+
+#-------------------------------------------------------------------
+# hash_leaf()
+# hash_node()
+#
+# Leaf and interior node digests as lists of 8 words.
+#-------------------------------------------------------------------
+def hash_leaf(record):
+    return list(DIGEST_STRUCT.unpack(sha256_hasher.sha256(record).digest()))
+
+
+def hash_node(left, right):
+    global _node_padding_schedule
+    compress = get_fast_compress()
+    if _node_padding_schedule is None:
+        _node_padding_schedule = get_fast_expand()(NODE_PADDING_BLOCK)
+    H = compress(IV_SHA256, get_fast_expand()(left + right))
+    return compress(H, _node_padding_schedule)
+
+
+#-------------------------------------------------------------------
+# build_levels()
+#
+# All levels of the tree over the given nodes, from the nodes
+# up to the root.
+#-------------------------------------------------------------------
+def build_levels(nodes):
+    levels = [nodes]
+    while len(nodes) > 1:
+        parents = [hash_node(nodes[i], nodes[i + 1])
+                   for i in range(0, len(nodes) - 1, 2)]
+        if len(nodes) & 1:
+            parents.append(nodes[-1])
+        nodes = parents
+        levels.append(nodes)
+    return levels
+
+
+#-------------------------------------------------------------------
+# _hash_chunk()
+#
+# Process pool job: hash the records of one chunk and build the
+# levels of its subtree, padded to depth levels by carrying the
+# root up, so that the chunks of the last partial chunk line up
+# with the full ones.
+#-------------------------------------------------------------------
+def _hash_chunk(records, depth):
+    levels = build_levels([hash_leaf(record) for record in records])
+    while len(levels) < depth:
+        levels.append(levels[-1])
+    return levels
+
+
+#-------------------------------------------------------------------
+# MerkleTree()
+#-------------------------------------------------------------------
+class MerkleTree():
+    def __init__(self, records = None, jobs = 1,
+                 chunk_size = DEFAULT_CHUNK_SIZE,
+                 cache_size = DEFAULT_CACHE_SIZE):
+        if chunk_size & (chunk_size - 1):
+            raise ValueError("Chunk size %d is not a power of two." % chunk_size)
+        self.chunk_size = chunk_size
+        self.cache_size = cache_size
+        self.leaves = []
+        self.depth = 0
+        self.root_node = None
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if records is not None:
+            self.build(records, jobs)
+
+
+    # Hash all records and build the tree. Levels that fit in
+    # the cache are kept, starting from the root.
+    def build(self, records, jobs = 1):
+        records = list(records)
+        if not records:
+            raise ValueError("A Merkle tree needs at least one record.")
+        depth = self.chunk_size.bit_length()
+        chunks = [records[i : i + self.chunk_size]
+                  for i in range(0, len(records), self.chunk_size)]
+        if jobs > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = list(executor.map(_hash_chunk, chunks,
+                                            [depth] * len(chunks)))
+        else:
+            results = [_hash_chunk(chunk, depth) for chunk in chunks]
+
+        levels = [[node for result in results for node in result[k]]
+                  for k in range(depth)]
+        levels += build_levels(levels[-1])[1:]
+        self.leaves = levels[0]
+        self.depth = len(levels) - 1
+        self.root_node = levels[-1][0]
+
+        self.cache.clear()
+        for level in range(self.depth, 0, -1):
+            if len(self.cache) + len(levels[level]) > self.cache_size:
+                break
+            for (index, node) in enumerate(levels[level]):
+                self.cache[(level, index)] = node
+
+
+    # Change one record and invalidate the nodes above it.
+    def update(self, index, record):
+        self.leaves[index] = hash_leaf(record)
+        self.root_node = None
+        for level in range(1, self.depth + 1):
+            self.cache.pop((level, index >> level), None)
+
+
+    def node(self, level, index):
+        if level == 0:
+            return self.leaves[index]
+        key = (level, index)
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        self.misses += 1
+        left = self.node(level - 1, 2 * index)
+        if ((2 * index + 1) << (level - 1)) < len(self.leaves):
+            node = hash_node(left, self.node(level - 1, 2 * index + 1))
+        else:
+            node = left
+        self.cache[key] = node
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return node
+
+
+    def root(self):
+        if self.root_node is None:
+            self.root_node = self.node(self.depth, 0)
+        return words_to_bytes(self.root_node)
+
+
+    def info(self):
+        return (self.hits, self.misses, self.cache_size, len(self.cache))
+
+
+#-------------------------------------------------------------------
+# merkle_root()
+#
+# Root of the tree over records.
+#-------------------------------------------------------------------
+def merkle_root(records, jobs = 1, chunk_size = DEFAULT_CHUNK_SIZE):
+    return MerkleTree(records, jobs, chunk_size, cache_size=0).root()
+
+
+#-------------------------------------------------------------------
+# _reference_root()
+#
+# Straightforward hashlib implementation for the tests.
+#-------------------------------------------------------------------
+def _reference_root(records):
+    nodes = [hashlib.sha256(record).digest() for record in records]
+    while len(nodes) > 1:
+        parents = [hashlib.sha256(nodes[i] + nodes[i + 1]).digest()
+                   for i in range(0, len(nodes) - 1, 2)]
+        if len(nodes) & 1:
+            parents.append(nodes[-1])
+        nodes = parents
+    return nodes[0]
+
+
+#-------------------------------------------------------------------
+# merkle_tests()
+#
+# Compare roots with the hashlib reference for different leaf
+# counts, chunk sizes and worker counts, then update leaves with
+# a small cache and compare again.
+#-------------------------------------------------------------------
+def merkle_tests():
+    print("Running Merkle root tests:")
+    errors = 0
+    records = [os.urandom(i % 150) for i in range(100)]
+    for n in list(range(1, 18)) + [64, 100]:
+        for (jobs, chunk_size) in [(1, 1024), (1, 4), (2, 8)]:
+            if merkle_root(records[:n], jobs, chunk_size) != _reference_root(records[:n]):
+                print("Error: root mismatch for %d leaves, %d jobs, chunk %d." %
+                      (n, jobs, chunk_size))
+                errors += 1
+
+    for cache_size in [0, 8, 1000]:
+        records = [os.urandom(40) for i in range(77)]
+        tree = MerkleTree(records, chunk_size=16, cache_size=cache_size)
+        for i in [0, 76, 33, 34, 64, 33]:
+            records[i] = os.urandom(50)
+            tree.update(i, records[i])
+            if tree.root() != _reference_root(records):
+                print("Error: root mismatch after update of leaf %d, "
+                      "cache size %d." % (i, cache_size))
+                errors += 1
+
+    if errors == 0:
+        print("Test case ok.")
+    print("")
+
+
+#-------------------------------------------------------------------
+# merkle_benchmark()
+#
+# Leaves/s for building a tree with one and more workers, and
+# for updating single leaves.
+#-------------------------------------------------------------------
+def merkle_benchmark(n = 1 << 13):
+    print("Running Merkle root benchmark with %d leaves:" % n)
+    records = [os.urandom(100) for i in range(n)]
+    for jobs in sorted(set([1, 2, os.cpu_count() or 1])):
+        start = time.perf_counter()
+        tree = MerkleTree(records, jobs)
+        seconds = time.perf_counter() - start
+        print("Build, %d jobs: %10.1f leaves/s" % (jobs, n / seconds))
+
+    start = time.perf_counter()
+    for i in range(0, n, 64):
+        tree.update(i, os.urandom(100))
+        tree.root()
+    seconds = time.perf_counter() - start
+    print("Update and re-root: %10.1f leaves/s" % ((n // 64) / seconds))
+    print("Node cache: %d hits, %d misses, maxsize %d, currsize %d." % tree.info())
+    print("")
+
+
+#-------------------------------------------------------------------
+# main()
+#-------------------------------------------------------------------
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--bench":
+        merkle_benchmark()
+        return
+
+    merkle_tests()
+
+
+#-------------------------------------------------------------------
+# __name__
+# Python thingy which allows the file to be run standalone as
+# well as parsed from within a Python interpreter.
+#-------------------------------------------------------------------
+if __name__=="__main__":
+    # Run the main function.
+    sys.exit(main())
+
+#=======================================================================
+# EOF sha256_merkle.py
+#=======================================================================
@@ -0,0 +1,422 @@
+#-------------------------------------------------------------------
+# sha256_nonce.py
+#
+# Double SHA-256 nonce scan engine for 80 byte block headers
+# (Bitcoin style). The header is hashed, then the 32 byte digest
+# is hashed again, for every value of the little endian nonce in
+# the last four header bytes. A nonce is a hit if the second
+# digest, read as a little endian number, is at most the target.
+#
+# Per header the engine:
+#   - compresses the constant first 64 bytes once (midstate),
+#   - precomputes the first three rounds of the second block,
+#     which come before the nonce word,
+#   - folds the nonce independent parts of the second block
+#     schedule into constants,
+#   - uses a fixed padding template for the 32 byte second
+#     message, folding its constant schedule words as well,
+#   - stops the second hash after round 60, where the last
+#     digest word is known, and only finishes hashes that can
+#     be hits.
+# All of this is generated as straight line code, like the fast
+# engine in sha256.py. Every hit is recomputed with the model
+# and checked against hashlib.
+#
+# Usage:
+#   python sha256_nonce.py              (runs the self tests)
+#   python sha256_nonce.py --bench      (hashes/s benchmark)
+#-------------------------------------------------------------------
+
+#-------------------------------------------------------------------
+# Python module imports.
+#-------------------------------------------------------------------
+import os
+import sys
+import time
+import struct
+import hashlib
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from sha256 import K, IV_SHA256
+from sha256 import get_fast_compress, get_fast_expand
+from sha256_codec import BLOCK_STRUCT, words_to_bytes
+from sha256_padder import padding_words
+import sha256_hasher
+
+
+#-------------------------------------------------------------------
+# Constants.
+#-------------------------------------------------------------------
+HEADER_BYTES = 80
+NONCES_PER_JOB = 1 << 12
+JOBS_IN_FLIGHT = 4
+
+# Padding of the 80 byte header in the second block (after the
+# 16 bytes with the nonce) and of the 32 byte second message.
+HEADER_PADDING = padding_words(HEADER_BYTES)
+DIGEST_PADDING = padding_words(32)
+
+
+#-------------------------------------------------------------------
+# Helper functions for the precomputation.
+#-------------------------------------------------------------------
+def _rotr(x, n):
+    return ((x >> n) | (x << (32 - n))) & 0xffffffff
+
+
+def _s0(x):
+    return _rotr(x, 7) ^ _rotr(x, 18) ^ (x >> 3)
+
+
+def _s1(x):
+    return _rotr(x, 17) ^ _rotr(x, 19) ^ (x >> 10)
+
+
+def _round(state, k, w):
+    (a, b, c, d, e, f, g, h) = state
+    t1 = (h + (_rotr(e, 6) ^ _rotr(e, 11) ^ _rotr(e, 25)) +
+          ((e & f) ^ (~e & g)) + k + w) & 0xffffffff
+    t2 = ((_rotr(a, 2) ^ _rotr(a, 13) ^ _rotr(a, 22)) +
+          ((a & b) ^ (a & c) ^ (b & c))) & 0xffffffff
+    return [(t1 + t2) & 0xffffffff, a, b, c, (d + t1) & 0xffffffff, e, f, g]
+
+
+#-------------------------------------------------------------------
+# _gen_schedule_src()
+#
+# Lines computing w16..w63 where the words in known are
+# constants. Constant terms are added up at generation time,
+# words that only depend on constants become constants too.
+# Returns the lines and a function giving the expression for
+# word t.
+#-------------------------------------------------------------------
+def _gen_schedule_src(known, indent):
+    known = dict(known)
+    src = []
+
+    def word(t):
+        if t in known:
+            return "0x%08x" % known[t]
+        return "w%d" % t
+
+    for t in range(16, 64):
+        sources = [t - 2, t - 7, t - 15, t - 16]
+        if all(s in known for s in sources):
+            known[t] = (_s1(known[t - 2]) + known[t - 7] +
+                        _s0(known[t - 15]) + known[t - 16]) & 0xffffffff
+            continue
+
+        const = 0
+        terms = []
+        if t - 2 in known:
+            const += _s1(known[t - 2])
+        else:
+            src.append("%su = w%d * 0x100000001" % (indent, t - 2))
+            terms.append("(u >> 17 ^ u >> 19 ^ w%d >> 10)" % (t - 2))
+        if t - 7 in known:
+            const += known[t - 7]
+        else:
+            terms.append("w%d" % (t - 7))
+        if t - 15 in known:
+            const += _s0(known[t - 15])
+        else:
+            src.append("%sv = w%d * 0x100000001" % (indent, t - 15))
+            terms.append("(v >> 7 ^ v >> 18 ^ w%d >> 3)" % (t - 15))
+        if t - 16 in known:
+            const += known[t - 16]
+        else:
+            terms.append("w%d" % (t - 16))
+        if const & 0xffffffff:
+            terms.append("0x%08x" % (const & 0xffffffff))
+        src.append("%sw%d = (%s) & 0xffffffff" % (indent, t, " + ".join(terms)))
+    return (src, word)
+
+
+#-------------------------------------------------------------------
+# _gen_rounds_src()
+#
+# Lines for rounds first..last. The state is in the variables
+# named by v, which is updated to name the state after the last
+# round (the variables are renamed instead of shifted).
+#-------------------------------------------------------------------
+def _gen_rounds_src(v, word, first, last, indent):
+    src = []
+    for t in range(first, last + 1):
+        (a, b, c, d, e, f, g, h) = v
+        src.append("%su = %s * 0x100000001" % (indent, e))
+        src.append("%st1 = %s + (u >> 6 ^ u >> 11 ^ u >> 25) + "
+                   "(%s ^ (%s & (%s ^ %s))) + 0x%08x + %s" %
+                   (indent, h, g, e, f, g, K[t], word(t)))
+        src.append("%su = %s * 0x100000001" % (indent, a))
+        src.append("%s%s = (%s + t1) & 0xffffffff" % (indent, d, d))
+        src.append("%s%s = (t1 + (u >> 2 ^ u >> 13 ^ u >> 22) + "
+                   "((%s & %s) | (%s & (%s | %s)))) & 0xffffffff" %
+                   (indent, h, a, b, c, a, b))
+        v[:] = [h, a, b, c, d, e, f, g]
+    return src
+
+
+#-------------------------------------------------------------------
+# _gen_scan_src()
+#
+# Source of scan(start, stop, target7) for a header with the
+# given midstate and the three constant words of the second
+# block. Returns the nonces where the last word of the second
+# digest, as the most significant word of the little endian
+# hash, is at most target7.
+#-------------------------------------------------------------------
+def _gen_scan_src(midstate, tail_words):
+    indent = "        "
+    known = {0 : tail_words[0], 1 : tail_words[1], 2 : tail_words[2]}
+    for (i, x) in enumerate(HEADER_PADDING):
+        known[4 + i] = x
+
+    state = list(midstate)
+    for t in range(3):
+        state = _round(state, K[t], known[t])
+
+    src = ["def scan(start, stop, target7):",
+           "    hits = []",
+           "    for n in range(start, stop):",
+           indent + "w3 = ((n & 0xff) << 24 | (n & 0xff00) << 8 |"
+           " (n >> 8) & 0xff00 | n >> 24)"]
+
+    # Second block of the header, from round 3.
+    (schedule, word) = _gen_schedule_src(known, indent)
+    src += schedule
+    v = ["a", "b", "c", "d", "e", "f", "g", "h"]
+    src.append(indent + "(%s) = (%s)" %
+               (", ".join(v), ", ".join(["0x%08x" % x for x in state])))
+    src += _gen_rounds_src(v, word, 3, 63, indent)
+    for i in range(8):
+        src.append(indent + "w%d = (0x%08x + %s) & 0xffffffff" %
+                   (i, midstate[i], v[i]))
+
+    # Second hash of the 32 byte digest, up to round 60.
+    known = {}
+    for (i, x) in enumerate(DIGEST_PADDING):
+        known[8 + i] = x
+    (schedule, word) = _gen_schedule_src(known, indent)
+    src += schedule
+    v = ["a", "b", "c", "d", "e", "f", "g", "h"]
+    src.append(indent + "(%s) = (%s)" %
+               (", ".join(v), ", ".join(["0x%08x" % x for x in IV_SHA256])))
+    src += _gen_rounds_src(v, word, 0, 60, indent)
+
+    # After round 60 e is what h will be after round 63.
+    src.append(indent + "h7 = (0x%08x + %s) & 0xffffffff" % (IV_SHA256[7], v[4]))
+    src.append(indent + "if ((h7 & 0xff) << 24 | (h7 & 0xff00) << 8 |"
+               " (h7 >> 8) & 0xff00 | h7 >> 24) <= target7:")
+    src.append(indent + "    hits.append(n)")
+    src.append("    return hits")
+    return "\n".join(src) + "\n"
+
+
+#-------------------------------------------------------------------
+# NonceScanner()
+#
+# Scan engine for one header (the first 76 bytes are used, the
+# nonce bytes are replaced). scan() returns the hits in a range
+# of nonces as (nonce, digest) tuples, where digest is the
+# double hash checked against hashlib.
+#-------------------------------------------------------------------
+class NonceScanner():
+    def __init__(self, header, target):
+        if len(header) not in [76, HEADER_BYTES]:
+            raise ValueError("Expected a 76 or 80 byte header, got %d bytes." %
+                             len(header))
+        self.header = bytes(header[:76])
+        self.target = target
+        self.compress = get_fast_compress()
+        self.expand = get_fast_expand()
+        first_block = BLOCK_STRUCT.unpack(self.header[:64])
+        self.midstate = self.compress(IV_SHA256, self.expand(first_block))
+        self.tail_words = list(struct.unpack(">3I", self.header[64:76]))
+
+        namespace = {}
+        exec(compile(_gen_scan_src(self.midstate, self.tail_words),
+                     "<sha256_nonce>", "exec"), namespace)
+        self._scan = namespace["scan"]
+
+
+    # Full double hash of a nonce with the model.
+    def double_hash(self, nonce):
+        w3 = struct.unpack(">I", nonce.to_bytes(4, "little"))[0]
+        block = self.tail_words + [w3] + HEADER_PADDING
+        H = self.compress(self.midstate, self.expand(block))
+        H = self.compress(IV_SHA256, self.expand(H + DIGEST_PADDING))
+        return words_to_bytes(H)
+
+
+    def scan(self, start, count):
+        hits = []
+        for nonce in self._scan(start, start + count, self.target >> 224):
+            digest = self.double_hash(nonce)
+            header = self.header + nonce.to_bytes(4, "little")
+            expected = hashlib.sha256(hashlib.sha256(header).digest()).digest()
+            if digest != expected:
+                raise ValueError("Model and hashlib differ for nonce %d." % nonce)
+            if int.from_bytes(digest, "little") <= self.target:
+                hits.append((nonce, digest))
+        return hits
+
+
+#-------------------------------------------------------------------
+# _scan_job()
+#
+# Process pool job: scan one range of nonces.
+#-------------------------------------------------------------------
+def _scan_job(header, target, start, count):
+    return NonceScanner(header, target).scan(start, count)
+
+
+#-------------------------------------------------------------------
+# scan_nonces()
+#
+# Scan count nonces from start, in ranges of NONCES_PER_JOB.
+# With jobs > 1 the ranges go to a process pool with at most
+# JOBS_IN_FLIGHT ranges per worker submitted at a time, refilled
+# as they complete. Returns the hits in nonce order, and stops
+# after the first max_hits hits if given.
+#-------------------------------------------------------------------
+def scan_nonces(header, target, start = 0, count = 1 << 32, jobs = 1,
+                max_hits = None):
+    end = start + min(count, (1 << 32) - start)
+    ranges = ((first, min(NONCES_PER_JOB, end - first))
+              for first in range(start, end, NONCES_PER_JOB))
+    hits = []
+    if jobs <= 1:
+        scanner = NonceScanner(header, target)
+        for (first, n) in ranges:
+            hits += scanner.scan(first, n)
+            if (max_hits is not None) and (len(hits) >= max_hits):
+                return hits[:max_hits]
+        return hits
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        for (first, n) in itertools.islice(ranges, jobs * JOBS_IN_FLIGHT):
+            pending.append(executor.submit(_scan_job, header, target, first, n))
+        while pending:
+            hits += pending.popleft().result()
+            if (max_hits is not None) and (len(hits) >= max_hits):
+                for future in pending:
+                    future.cancel()
+                return hits[:max_hits]
+            for (first, n) in itertools.islice(ranges, 1):
+                pending.append(executor.submit(_scan_job, header, target, first, n))
+    return hits
+
+
+#-------------------------------------------------------------------
+# bits_to_target()
+#
+# Target from the compact "bits" header field.
+#-------------------------------------------------------------------
+def bits_to_target(bits):
+    return (bits & 0xffffff) << (8 * ((bits >> 24) - 3))
+
+
+#-------------------------------------------------------------------
+# nonce_tests()
+#
+# Find the nonce of the Bitcoin genesis block in a small range
+# around it, and compare the hits for an easy target with a
+# brute force search with hashlib, with and without workers,
+# also when stopping after a number of hits.
+#-------------------------------------------------------------------
+def nonce_tests():
+    print("Running double SHA-256 nonce scan tests:")
+    errors = 0
+    genesis = bytes.fromhex(
+        "01000000" + "00" * 32 +
+        "3ba3edfd7a7b12b27ac72c3e67768f617fc81bc3888a51323a9fb8aa4b1e5e4a"
+        "29ab5f49ffff001d1dac2b7c")
+    genesis_hash = ("000000000019d6689c085ae165831e934ff763ae"
+                    "46a2a6c172b3f1b60a8ce26f")
+    nonce = int.from_bytes(genesis[76:], "little")
+    hits = scan_nonces(genesis, bits_to_target(0x1d00ffff), nonce - 100, 200)
+    if ((len(hits) != 1) or (hits[0][0] != nonce) or
+        (hits[0][1][::-1].hex() != genesis_hash)):
+        print("Error: genesis block nonce not found, got %s." % hits)
+        errors += 1
+
+    header = os.urandom(HEADER_BYTES)
+    target = (1 << 250) - 1
+    expected = []
+    for n in range(1000, 2000):
+        data = header[:76] + n.to_bytes(4, "little")
+        digest = hashlib.sha256(hashlib.sha256(data).digest()).digest()
+        if int.from_bytes(digest, "little") <= target:
+            expected.append((n, digest))
+    for jobs in [1, 2]:
+        hits = scan_nonces(header, target, 1000, 1000, jobs)
+        if hits != expected:
+            print("Error: %d hits with %d jobs, expected %d." %
+                  (len(hits), jobs, len(expected)))
+            errors += 1
+        hits = scan_nonces(header, target, 1000, 1000, jobs, max_hits=3)
+        if hits != expected[:3]:
+            print("Error: max_hits=3 with %d jobs gave %d hits." % (jobs, len(hits)))
+            errors += 1
+
+    # The full nonce range stops at the first hit.
+    start = time.perf_counter()
+    hits = scan_nonces(header, target, jobs=2, max_hits=1)
+    if (len(hits) != 1) or (time.perf_counter() - start > 60):
+        print("Error: full range scan did not stop at the first hit.")
+        errors += 1
+
+    if errors == 0:
+        print("Test case ok.")
+    print("")
+
+
+#-------------------------------------------------------------------
+# nonce_benchmark()
+#
+# Hashes/s of the scan engine and of double hashing complete
+# headers with the hashlib like model interface.
+#-------------------------------------------------------------------
+def nonce_benchmark(n = 4000):
+    print("Running nonce scan benchmark:")
+    header = os.urandom(HEADER_BYTES)
+    start = time.perf_counter()
+    for i in range(n):
+        data = header[:76] + i.to_bytes(4, "little")
+        sha256_hasher.sha256(sha256_hasher.sha256(data).digest()).digest()
+    naive = n / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    scanner = NonceScanner(header, 0)
+    scanner.scan(0, n)
+    scan = n / (time.perf_counter() - start)
+    print("Model double hash: %10.1f hashes/s" % naive)
+    print("Scan engine:       %10.1f hashes/s" % scan)
+    print("")
+
+
+#-------------------------------------------------------------------
+# main()
+#-------------------------------------------------------------------
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--bench":
+        nonce_benchmark()
+        return
+
+    nonce_tests()
+
+
+#-------------------------------------------------------------------
+# __name__
+# Python thingy which allows the file to be run standalone as
+# well as parsed from within a Python interpreter.
+#-------------------------------------------------------------------
+if __name__=="__main__":
+    # Run the main function.
+    sys.exit(main())
+
+#=======================================================================
+# EOF sha256_nonce.py
+#=======================================================================
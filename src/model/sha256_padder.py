@@ -0,0 +1,232 @@
+#-------------------------------------------------------------------
+# sha256_padder.py
+#
+# Streaming SHA-256 message padder. pad_blocks() takes a
+# bytes-like object, a file object or any iterable of byte
+# chunks and lazily yields the padded message as 512 bit
+# blocks, as lists of words (for the model), ints (for the
+# core's block port) or bytes.
+#
+# Only the current chunk and up to 63 bytes of carry are held
+# in memory, so the memory use does not depend on the length
+# of the message. File objects are read with readinto() into
+# one reused buffer where possible.
+#
+# padding_tail() and padding_words() are the only place the
+# padding is built. The hashlib like interface, the CAVP runner,
+# HMAC, the nonce scanner, the Merkle tree, pad.py and the
+# testbench message transactions all use them.
+#-------------------------------------------------------------------
+
+#-------------------------------------------------------------------
+# Python module imports.
+#-------------------------------------------------------------------
+import io
+import sys
+import struct
+import random
+import hashlib
+import tracemalloc
+from sha256 import SHA256
+from sha256_codec import BLOCK_BYTES, BLOCK_STRUCT, digest_to_bytes
+
+
+#-------------------------------------------------------------------
+# Constants.
+#-------------------------------------------------------------------
+DEFAULT_CHUNK_SIZE = 1 << 16
+LENGTH_STRUCT = struct.Struct(">Q")
+
+
+#-------------------------------------------------------------------
+# padded_blocks()
+#
+# Number of blocks of a padded message of length bytes.
+#-------------------------------------------------------------------
+def padded_blocks(length):
+    return (length + 8) // BLOCK_BYTES + 1
+
+
+#-------------------------------------------------------------------
+# padding_tail()
+#
+# The bytes that follow the last rest bytes of a message of
+# length bytes: the rest itself, the 0x80 byte, the zeroes and
+# the 64 bit bit length. Always one or two blocks.
+#
+# For a bit oriented message of length bytes and bits more
+# bits, the last byte of rest holds those bits left aligned
+# and the 1 bit is set right after them.
+#-------------------------------------------------------------------
+def padding_tail(length, rest = b"", bits = 0):
+    tail = bytearray(rest)
+    if bits:
+        tail[-1] = (tail[-1] & (0xff00 >> bits) & 0xff) | (0x80 >> bits)
+    else:
+        tail.append(0x80)
+    tail += bytes((BLOCK_BYTES - 8 - len(tail)) % BLOCK_BYTES)
+    tail += LENGTH_STRUCT.pack((length * 8 + bits) & 0xffffffffffffffff)
+    return tail
+
+
+#-------------------------------------------------------------------
+# padding_words()
+#
+# The padding that follows a message of length bytes, a
+# multiple of 4, as a list of 32 bit words. For the constant
+# padding of messages with a fixed length.
+#-------------------------------------------------------------------
+def padding_words(length):
+    rest = length % BLOCK_BYTES
+    tail = padding_tail(length, bytes(rest))[rest:]
+    return list(struct.unpack(">%dI" % (len(tail) // 4), tail))
+
+
+#-------------------------------------------------------------------
+# _chunks()
+#
+# Yield the data of a source as memoryviews. A view is only
+# valid until the next one is taken.
+#-------------------------------------------------------------------
+def _chunks(source, chunk_size):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield memoryview(source).cast("B")
+        return
+
+    if hasattr(source, "readinto"):
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        while True:
+            n = source.readinto(buf)
+            if not n:
+                return
+            yield view[:n]
+
+    elif hasattr(source, "read"):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            yield memoryview(chunk).cast("B")
+
+    else:
+        for chunk in source:
+            yield memoryview(chunk).cast("B")
+
+
+#-------------------------------------------------------------------
+# pad_blocks()
+#
+# Generator of the padded blocks of the message in source.
+# form is "words", "int" or "bytes".
+#-------------------------------------------------------------------
+def pad_blocks(source, form = "words", chunk_size = DEFAULT_CHUNK_SIZE):
+    if form == "words":
+        convert = BLOCK_STRUCT.unpack_from
+    elif form == "int":
+        convert = lambda buf, offset = 0: int.from_bytes(
+            buf[offset : offset + BLOCK_BYTES], "big")
+    elif form == "bytes":
+        convert = lambda buf, offset = 0: bytes(buf[offset : offset + BLOCK_BYTES])
+    else:
+        raise ValueError("Given %s is not a supported block form." % form)
+
+    length = 0
+    carry = bytearray()
+    for chunk in _chunks(source, chunk_size):
+        length += len(chunk)
+        if carry:
+            n = BLOCK_BYTES - len(carry)
+            carry += chunk[:n]
+            chunk = chunk[n:]
+            if len(carry) < BLOCK_BYTES:
+                continue
+            yield convert(carry)
+            carry.clear()
+
+        end = len(chunk) - (len(chunk) % BLOCK_BYTES)
+        for offset in range(0, end, BLOCK_BYTES):
+            yield convert(chunk, offset)
+        carry += chunk[end:]
+
+    tail = padding_tail(length, carry)
+    for offset in range(0, len(tail), BLOCK_BYTES):
+        yield convert(tail, offset)
+
+
+#-------------------------------------------------------------------
+# padder_tests()
+#
+# Hash messages of different lengths from all kinds of sources
+# and in all block forms with the model and compare to hashlib.
+# Then check that padding a long message uses constant memory.
+#-------------------------------------------------------------------
+def padder_tests():
+    print("Running streaming padder tests:")
+    errors = 0
+    message = bytes(random.getrandbits(8) for i in range(1100))
+    for length in [0, 1, 55, 56, 63, 64, 65, 119, 120, 128, 1000, 1100]:
+        data = message[:length]
+        expected = hashlib.sha256(data).digest()
+        sources = [("bytes", lambda: data),
+                   ("memoryview", lambda: memoryview(data)),
+                   ("BytesIO", lambda: io.BytesIO(data)),
+                   ("chunks", lambda: [data[i : i + 7]
+                                       for i in range(0, len(data), 7)])]
+        for (name, source) in sources:
+            for form in ["words", "int", "bytes"]:
+                my_sha256 = SHA256()
+                my_sha256.init()
+                n = 0
+                for block in pad_blocks(source(), form, chunk_size=100):
+                    my_sha256.next(block)
+                    n += 1
+                if ((digest_to_bytes(my_sha256.get_digest()) != expected) or
+                    (n != padded_blocks(length))):
+                    print("Error: %s, %s form, length %d failed." %
+                          (name, form, length))
+                    errors += 1
+
+    # 16 MB from an iterable of 1 MB chunks.
+    chunk = bytes(1 << 20)
+    tracemalloc.start()
+    n = 0
+    for block in pad_blocks((chunk for i in range(16)), "int"):
+        n += 1
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if (n != padded_blocks(16 << 20)) or (peak > 64 * 1024):
+        print("Error: %d blocks, peak memory %d bytes." % (n, peak))
+        errors += 1
+
+    # Fixed length padding, an 80 byte header and a 32 byte digest.
+    if ((padding_words(80) != [0x80000000] + [0] * 10 + [640]) or
+        (padding_words(32) != [0x80000000] + [0] * 6 + [256])):
+        print("Error: padding_words() gave %s, %s." %
+              (padding_words(80), padding_words(32)))
+        errors += 1
+
+    if errors == 0:
+        print("Test case ok.")
+    print("")
+
+
+#-------------------------------------------------------------------
+# main()
+#-------------------------------------------------------------------
+def main():
+    padder_tests()
+
+
+#-------------------------------------------------------------------
+# __name__
+# Python thingy which allows the file to be run standalone as
+# well as parsed from within a Python interpreter.
+#-------------------------------------------------------------------
+if __name__=="__main__":
+    # Run the main function.
+    sys.exit(main())
+
+#=======================================================================
+# EOF sha256_padder.py
+#=======================================================================
@@ -0,0 +1,237 @@
+#-------------------------------------------------------------------
+# sha256_swar.py
+#
+# Pure Python multi-lane engine for the SHA256 model. The words
+# of K independent blocks are packed into single Python ints,
+# one 64 bit slot per lane (32 data bits and 32 guard bits), so
+# that one rotate/xor/add sequence advances all lanes together.
+#
+# Carries from additions end up in the guard bits and are
+# removed by masking. Rotations are done on a doubled copy of
+# each lane (x | x << 32) that fits in the slot, so a rotate is
+# a single shift of the packed int. Sigma terms are masked
+# before they are added, so that garbage in the guard bits
+# never carries into the next lane.
+#-------------------------------------------------------------------
+
+#-------------------------------------------------------------------
+# Python module imports.
+#-------------------------------------------------------------------
+import sys
+import time
+import random
+import struct
+from sha256 import SHA256, K, IV_SHA224, IV_SHA256
+
+
+#-------------------------------------------------------------------
+# Constants.
+#-------------------------------------------------------------------
+# The lane count benchmark doubles the lanes until BENCH_DROPS
+# lane counts in a row are slower than the best one so far, so
+# one noisy measurement does not end the sweep early.
+BENCH_MAX_LANES = 1 << 16
+BENCH_DROPS = 2
+
+
+#-------------------------------------------------------------------
+# SHA256SWAR()
+#
+# Same init()/next()/get_digest() interface as SHA256, but
+# next() takes one block per lane and get_digest() returns one
+# digest per lane. The mode is either a mode name used for all
+# lanes or a list with one mode bit per lane (1 = sha256,
+# 0 = sha224, as the mode input of the core).
+#-------------------------------------------------------------------
+class SHA256SWAR():
+    def __init__(self, lanes, mode = "sha256"):
+        if isinstance(mode, str):
+            if mode not in ["sha224", "sha256"]:
+                raise ValueError("Given %s is not a supported mode." % mode)
+            mode = [int(mode == "sha256")] * lanes
+        if len(mode) != lanes:
+            raise ValueError("Expected %d mode bits, got %d." %
+                             (lanes, len(mode)))
+
+        self.lanes = lanes
+        self.mode = list(mode)
+        self.ones = _pack_words([1] * lanes)
+        self.mask = self.ones * 0xffffffff
+        self.K = [k * self.ones for k in K]
+        self.H = [0] * 8
+
+
+    def init(self):
+        ivs = [IV_SHA256 if m else IV_SHA224 for m in self.mode]
+        self.H = [_pack_words([iv[i] for iv in ivs]) for i in range(8)]
+
+
+    def next(self, blocks):
+        if len(blocks) != self.lanes:
+            raise ValueError("Expected %d blocks, got %d." %
+                             (self.lanes, len(blocks)))
+
+        M = self.mask
+        Kp = self.K
+        W = [_pack_words([block[i] for block in blocks]) for i in range(16)]
+        for t in range(16, 64):
+            u = W[t - 2] | (W[t - 2] << 32)
+            x = W[t - 15] | (W[t - 15] << 32)
+            W.append(((((u >> 17) ^ (u >> 19) ^ (W[t - 2] >> 10)) & M) +
+                      W[t - 7] +
+                      (((x >> 7) ^ (x >> 18) ^ (W[t - 15] >> 3)) & M) +
+                      W[t - 16]) & M)
+
+        a, b, c, d, e, f, g, h = self.H
+        for t in range(64):
+            u = e | (e << 32)
+            t1 = (h + (((u >> 6) ^ (u >> 11) ^ (u >> 25)) & M) +
+                  (g ^ (e & (f ^ g))) + Kp[t] + W[t])
+            u = a | (a << 32)
+            t2 = ((((u >> 2) ^ (u >> 13) ^ (u >> 22)) & M) +
+                  ((a & b) | (c & (a | b))))
+            h = g
+            g = f
+            f = e
+            e = (d + t1) & M
+            d = c
+            c = b
+            b = a
+            a = (t1 + t2) & M
+
+        H = self.H
+        self.H = [(H[0] + a) & M, (H[1] + b) & M, (H[2] + c) & M,
+                  (H[3] + d) & M, (H[4] + e) & M, (H[5] + f) & M,
+                  (H[6] + g) & M, (H[7] + h) & M]
+
+
+    def get_digest(self):
+        words = [_unpack_words(x, self.lanes) for x in self.H]
+        return [[words[i][lane] for i in range(8)] for lane in range(self.lanes)]
+
+
+#-------------------------------------------------------------------
+# _pack_words()
+# _unpack_words()
+#
+# Convert between a list of 32 bit words, one per lane, and
+# the packed int with one 64 bit slot per lane. Lane 0 is the
+# least significant slot.
+#-------------------------------------------------------------------
+def _pack_words(words):
+    return int.from_bytes(struct.pack("<%dQ" % len(words), *words), "little")
+
+
+def _unpack_words(x, lanes):
+    return [w & 0xffffffff for w in
+            struct.unpack("<%dQ" % lanes, x.to_bytes(8 * lanes, "little"))]
+
+
+#-------------------------------------------------------------------
+# swar_benchmark()
+#
+# Measure blocks/sec for doubling lane counts until the
+# throughput drops, and return the lane count with the highest
+# throughput.
+#-------------------------------------------------------------------
+def swar_benchmark(max_lanes = BENCH_MAX_LANES, min_time = 0.5):
+    print("Running SWAR lane count benchmark:")
+    my_sha256 = SHA256()
+    my_sha256.init()
+    block = [random.getrandbits(32) for i in range(16)]
+    n = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_time:
+        my_sha256.next(block)
+        n += 1
+    scalar_rate = n / (time.perf_counter() - start)
+    print("scalar model: %10.1f blocks/s" % scalar_rate)
+
+    best_lanes = 1
+    best_rate = 0.0
+    drops = 0
+    lanes = 1
+    while (lanes <= max_lanes) and (drops < BENCH_DROPS):
+        my_swar = SHA256SWAR(lanes)
+        my_swar.init()
+        blocks = [[random.getrandbits(32) for i in range(16)]
+                  for lane in range(lanes)]
+        n = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < min_time:
+            my_swar.next(blocks)
+            n += lanes
+        rate = n / (time.perf_counter() - start)
+        print("%5d lanes:  %10.1f blocks/s (%.2fx scalar)" %
+              (lanes, rate, rate / scalar_rate))
+        if rate > best_rate:
+            best_lanes = lanes
+            best_rate = rate
+            drops = 0
+        else:
+            drops += 1
+        lanes *= 2
+
+    if drops < BENCH_DROPS:
+        print("Throughput still rising at %d lanes." % max_lanes)
+    print("Best lane count: %d, %.1f blocks/s (%.2fx scalar)" %
+          (best_lanes, best_rate, best_rate / scalar_rate))
+    print("")
+    return best_lanes
+
+
+#-------------------------------------------------------------------
+# swar_tests()
+#
+# Check all lanes against the scalar model for random multi
+# block messages with mixed modes.
+#-------------------------------------------------------------------
+def swar_tests(lanes = 37, n_blocks = 3):
+    print("Running SWAR engine tests with %d lanes:" % lanes)
+    mode_bits = [random.randint(0, 1) for i in range(lanes)]
+    blocks = [[[random.getrandbits(32) for j in range(16)]
+               for lane in range(lanes)] for k in range(n_blocks)]
+    blocks[0][0] = [0xffffffff] * 16
+
+    my_swar = SHA256SWAR(lanes, mode_bits)
+    my_swar.init()
+    for k in range(n_blocks):
+        my_swar.next(blocks[k])
+    digests = my_swar.get_digest()
+
+    errors = 0
+    for lane in range(lanes):
+        my_sha256 = SHA256(mode=["sha224", "sha256"][mode_bits[lane]])
+        my_sha256.init()
+        for k in range(n_blocks):
+            my_sha256.next(blocks[k][lane])
+        if my_sha256.get_digest() != digests[lane]:
+            print("Error: lane %d differs." % lane)
+            errors += 1
+
+    if errors == 0:
+        print("Test case ok.")
+    print("")
+
+
+#-------------------------------------------------------------------
+# main()
+#-------------------------------------------------------------------
+def main():
+    swar_tests()
+    if len(sys.argv) > 1 and sys.argv[1] == "--bench":
+        swar_benchmark()
+
+
+#-------------------------------------------------------------------
+# __name__
+# Python thingy which allows the file to be run standalone as
+# well as parsed from within a Python interpreter.
+#-------------------------------------------------------------------
+if __name__=="__main__":
+    # Run the main function.
+    sys.exit(main())
+
+#=======================================================================
+# EOF sha256_swar.py
+#=======================================================================
@@ -0,0 +1,310 @@
+#-------------------------------------------------------------------
+# sha256_trace.py
+#
+# Compact binary round traces for the SHA256 model. Instead of
+# printing the state in every round (verbose mode), a
+# TraceRecorder given to SHA256(trace=...) gets the input
+# chaining value and t1, t2, k, w, a..h of all 64 rounds of
+# each block in a preallocated array('I'), which is written to
+# the trace file as one fixed size record per block.
+#
+# TraceReader maps a trace file and decodes blocks lazily.
+# diff_traces() reports the first round where two traces
+# diverge, for example a model trace and a trace converted from
+# an RTL simulation.
+#
+# Usage:
+#   python sha256_trace.py dump TRACE [--block N]
+#   python sha256_trace.py diff TRACE_A TRACE_B
+#   python sha256_trace.py            (runs the self tests)
+#-------------------------------------------------------------------
+
+#-------------------------------------------------------------------
+# Python module imports.
+#-------------------------------------------------------------------
+import os
+import sys
+import mmap
+import random
+import struct
+import argparse
+import tempfile
+from array import array
+from sha256 import SHA256
+from sha256 import TRACE_HEAD_WORDS, TRACE_ROUND_WORDS, TRACE_BLOCK_WORDS
+
+
+#-------------------------------------------------------------------
+# Constants.
+#-------------------------------------------------------------------
+TRACE_MAGIC = b"S256TRC1"
+
+# magic, byte order of the records ("<" or ">"), words per block.
+HEADER_STRUCT = struct.Struct("<8sc3xI")
+
+ROUND_FIELDS = ["t1", "t2", "k", "w", "a", "b", "c", "d", "e", "f", "g", "h"]
+
+
+#-------------------------------------------------------------------
+# TraceRecorder()
+#
+# buf holds the trace of the current block and is filled in by
+# the model. end_block() appends it to the file.
+#-------------------------------------------------------------------
+class TraceRecorder():
+    def __init__(self, path):
+        self.buf = array("I", bytes(4 * TRACE_BLOCK_WORDS))
+        self.blocks = 0
+        self.file = open(path, "wb")
+        byteorder = b"<" if sys.byteorder == "little" else b">"
+        self.file.write(HEADER_STRUCT.pack(TRACE_MAGIC, byteorder,
+                                           TRACE_BLOCK_WORDS))
+
+
+    def end_block(self):
+        self.buf.tofile(self.file)
+        self.blocks += 1
+
+
+    def close(self):
+        self.file.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+#-------------------------------------------------------------------
+# TraceReader()
+#
+# Read access to a trace file. Blocks are only decoded when
+# asked for.
+#-------------------------------------------------------------------
+class TraceReader():
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        header = self.file.read(HEADER_STRUCT.size)
+        if len(header) != HEADER_STRUCT.size:
+            raise ValueError("%s is not a trace file." % path)
+        (magic, byteorder, block_words) = HEADER_STRUCT.unpack(header)
+        if (magic != TRACE_MAGIC) or (block_words != TRACE_BLOCK_WORDS):
+            raise ValueError("%s is not a trace file." % path)
+
+        self.swap = byteorder != (b"<" if sys.byteorder == "little" else b">")
+        self.record_size = 4 * TRACE_BLOCK_WORDS
+        self.blocks = (size - HEADER_STRUCT.size) // self.record_size
+        if self.blocks > 0:
+            self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.mm = None
+
+
+    def __len__(self):
+        return self.blocks
+
+
+    def block(self, i):
+        if not 0 <= i < self.blocks:
+            raise IndexError("Block %d not in trace." % i)
+        offset = HEADER_STRUCT.size + i * self.record_size
+        words = array("I")
+        words.frombytes(self.mm[offset : offset + self.record_size])
+        if self.swap:
+            words.byteswap()
+        return words
+
+
+    def state_in(self, i):
+        return list(self.block(i)[0 : TRACE_HEAD_WORDS])
+
+
+    def rounds(self, i):
+        words = self.block(i)
+        return [tuple(words[TRACE_HEAD_WORDS + r * TRACE_ROUND_WORDS :
+                            TRACE_HEAD_WORDS + (r + 1) * TRACE_ROUND_WORDS])
+                for r in range(64)]
+
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+        self.file.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+#-------------------------------------------------------------------
+# diff_traces()
+#
+# Compare two traces. Returns None if they are identical,
+# otherwise (block, round, fields) for the first difference,
+# where round is -1 for the input chaining value and fields
+# lists the names that differ in that round. If one trace is
+# a prefix of the other, round is None.
+#-------------------------------------------------------------------
+def diff_traces(path_a, path_b):
+    with TraceReader(path_a) as trace_a, TraceReader(path_b) as trace_b:
+        for i in range(min(len(trace_a), len(trace_b))):
+            words_a = trace_a.block(i)
+            words_b = trace_b.block(i)
+            if words_a == words_b:
+                continue
+
+            for j in range(TRACE_BLOCK_WORDS):
+                if words_a[j] != words_b[j]:
+                    break
+            if j < TRACE_HEAD_WORDS:
+                return (i, -1, ["H%d" % k for k in range(TRACE_HEAD_WORDS)
+                                if words_a[k] != words_b[k]])
+
+            r = (j - TRACE_HEAD_WORDS) // TRACE_ROUND_WORDS
+            base = TRACE_HEAD_WORDS + r * TRACE_ROUND_WORDS
+            return (i, r, [ROUND_FIELDS[k] for k in range(TRACE_ROUND_WORDS)
+                           if words_a[base + k] != words_b[base + k]])
+
+        if len(trace_a) != len(trace_b):
+            return (min(len(trace_a), len(trace_b)), None, [])
+    return None
+
+
+#-------------------------------------------------------------------
+# print_block()
+#
+# Print the trace of a block in the same format as the verbose
+# mode of the model.
+#-------------------------------------------------------------------
+def print_block(trace, i):
+    print("Block %d, state in:" % i)
+    print("H  = " + ", ".join(["0x%08x" % x for x in trace.state_in(i)]))
+    for (r, values) in enumerate(trace.rounds(i)):
+        print("State at round 0x%02x:" % r)
+        print("t1 = 0x%08x, t2 = 0x%08x" % values[0:2])
+        print("k  = 0x%08x, w  = 0x%08x" % values[2:4])
+        print("a  = 0x%08x, b  = 0x%08x" % values[4:6])
+        print("c  = 0x%08x, d  = 0x%08x" % values[6:8])
+        print("e  = 0x%08x, f  = 0x%08x" % values[8:10])
+        print("g  = 0x%08x, h  = 0x%08x" % values[10:12])
+        print("")
+
+
+#-------------------------------------------------------------------
+# trace_tests()
+#
+# Record the same message with the fast and the round engine
+# and check that the traces are identical, then corrupt one
+# round and check that the diff finds it.
+#-------------------------------------------------------------------
+def trace_tests():
+    print("Running round trace tests:")
+    errors = 0
+    blocks = [[random.getrandbits(32) for j in range(16)] for i in range(3)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = [os.path.join(tmp_dir, "fast.trc"),
+                 os.path.join(tmp_dir, "round.trc")]
+        for (path, fast) in zip(paths, [True, False]):
+            with TraceRecorder(path) as recorder:
+                my_sha256 = SHA256(fast=fast, trace=recorder)
+                my_sha256.init()
+                for block in blocks:
+                    my_sha256.next(block)
+
+        if diff_traces(paths[0], paths[1]) is not None:
+            print("Error: fast and round engine traces differ.")
+            errors += 1
+
+        with TraceReader(paths[0]) as trace:
+            last = trace.rounds(2)[63]
+            my_digest = [(x + y) & 0xffffffff for (x, y) in
+                         zip(trace.state_in(2), last[4:12])]
+            if my_digest != my_sha256.get_digest():
+                print("Error: trace does not end in the digest.")
+                errors += 1
+
+        # Flip a bit in w of round 20 of block 1.
+        offset = (HEADER_STRUCT.size + 4 * TRACE_BLOCK_WORDS +
+                  4 * (TRACE_HEAD_WORDS + 20 * TRACE_ROUND_WORDS + 3))
+        with open(paths[1], "r+b") as f:
+            f.seek(offset)
+            word = f.read(1)
+            f.seek(offset)
+            f.write(bytes([word[0] ^ 1]))
+
+        result = diff_traces(paths[0], paths[1])
+        if ((result is None) or (result[0:2] != (1, 20)) or
+            ("w" not in result[2])):
+            print("Error: diff reported %s, expected block 1, round 20." %
+                  (result,))
+            errors += 1
+
+    if errors == 0:
+        print("Test case ok.")
+    print("")
+
+
+#-------------------------------------------------------------------
+# main()
+#-------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Dump and compare "
+                                     "SHA256 model round traces.")
+    subparsers = parser.add_subparsers(dest="command")
+    dump_parser = subparsers.add_parser("dump")
+    dump_parser.add_argument("trace")
+    dump_parser.add_argument("--block", type=int, default=None)
+    diff_parser = subparsers.add_parser("diff")
+    diff_parser.add_argument("trace_a")
+    diff_parser.add_argument("trace_b")
+    args = parser.parse_args()
+
+    if args.command == "dump":
+        with TraceReader(args.trace) as trace:
+            if args.block is None:
+                for i in range(len(trace)):
+                    print_block(trace, i)
+            else:
+                print_block(trace, args.block)
+        return 0
+
+    if args.command == "diff":
+        result = diff_traces(args.trace_a, args.trace_b)
+        if result is None:
+            print("Traces are identical.")
+            return 0
+        (block, round, fields) = result
+        if round is None:
+            print("Traces are identical up to block %d, then one ends." % block)
+        elif round < 0:
+            print("First difference in block %d, input state: %s" %
+                  (block, ", ".join(fields)))
+        else:
+            print("First difference in block %d, round 0x%02x: %s" %
+                  (block, round, ", ".join(fields)))
+        return 1
+
+    trace_tests()
+    return 0
+
+
+#-------------------------------------------------------------------
+# __name__
+# Python thingy which allows the file to be run standalone as
+# well as parsed from within a Python interpreter.
+#-------------------------------------------------------------------
+if __name__=="__main__":
+    # Run the main function.
+    sys.exit(main())
+
+#=======================================================================
+# EOF sha256_trace.py
+#=======================================================================
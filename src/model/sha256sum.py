@@ -0,0 +1,187 @@
+#-------------------------------------------------------------------
+# sha256sum.py
+#
+# Command line file hasher using the SHA256 model, in the
+# style of sha256sum. Files are read through mmap, never read
+# into memory as a whole. Many files can be hashed in parallel
+# in worker processes.
+#
+# Usage (from src/model):
+#   python -m sha256sum [--mode sha224|sha256] [--jobs N]
+#                       [--verify] [--int] [FILE ...]
+#
+# With no FILE, or when FILE is -, standard input is hashed.
+# Digests are printed on stdout, throughput per file and in
+# aggregate on stderr. --verify checks every digest against
+# hashlib. --int prints the digest as a decimal integer, as
+# expected by the +expected_sha plusarg of tb_sha256_stream.
+#-------------------------------------------------------------------
+
+#-------------------------------------------------------------------
+# Python module imports.
+#-------------------------------------------------------------------
+import os
+import sys
+import mmap
+import stat
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import sha256_hasher
+
+
+#-------------------------------------------------------------------
+# Constants.
+#-------------------------------------------------------------------
+STDIN_CHUNK_SIZE = 1 << 20
+
+
+#-------------------------------------------------------------------
+# _hash_chunks()
+#
+# Hash a file object in chunks until EOF. Returns the size.
+#-------------------------------------------------------------------
+def _hash_chunks(f, my_hash, ref_hash):
+    size = 0
+    while True:
+        chunk = f.read(STDIN_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        my_hash.update(chunk)
+        if ref_hash is not None:
+            ref_hash.update(chunk)
+    return size
+
+
+#-------------------------------------------------------------------
+# hash_path()
+#
+# Hash one file (or stdin for "-"). Returns a tuple with the
+# path, hex digest, size in bytes, time in seconds and, if
+# verify is set, whether hashlib gives the same digest.
+#
+# Only regular files with a non-zero size are mapped. FIFOs,
+# process substitution, /dev/stdin and files that report size
+# zero (such as /proc files) are read in chunks, as is a file
+# that can not be mapped.
+#-------------------------------------------------------------------
+def hash_path(path, mode = "sha256", verify = False):
+    my_hash = sha256_hasher.new(mode)
+    ref_hash = hashlib.new(mode) if verify else None
+    start = time.perf_counter()
+
+    if path == "-":
+        size = _hash_chunks(sys.stdin.buffer, my_hash, ref_hash)
+    else:
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            mm = None
+            if stat.S_ISREG(st.st_mode) and (st.st_size > 0):
+                try:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (OSError, ValueError):
+                    mm = None
+            if mm is None:
+                size = _hash_chunks(f, my_hash, ref_hash)
+            else:
+                with mm:
+                    size = len(mm)
+                    my_hash.update(mm)
+                    if verify:
+                        ref_hash.update(mm)
+
+    seconds = time.perf_counter() - start
+    digest = my_hash.hexdigest()
+    verified = (digest == ref_hash.hexdigest()) if verify else None
+    return (path, digest, size, seconds, verified)
+
+
+#-------------------------------------------------------------------
+# _hash_path_job()
+#
+# Worker process wrapper that returns errors instead of raising.
+#-------------------------------------------------------------------
+def _hash_path_job(args):
+    try:
+        return (hash_path(*args), None)
+    except OSError as e:
+        return (None, "%s: %s" % (args[0], e.strerror))
+
+
+#-------------------------------------------------------------------
+# _mb_per_s()
+#-------------------------------------------------------------------
+def _mb_per_s(size, seconds):
+    if seconds <= 0:
+        return 0.0
+    return size / seconds / 1e6
+
+
+#-------------------------------------------------------------------
+# main()
+#-------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(prog="sha256sum",
+                                     description="Hash files with the "
+                                     "SHA-256 Python model.")
+    parser.add_argument("files", nargs="*", default=["-"])
+    parser.add_argument("--mode", choices=["sha224", "sha256"], default="sha256")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="number of worker processes")
+    parser.add_argument("--verify", action="store_true",
+                        help="check every digest against hashlib")
+    parser.add_argument("--int", action="store_true",
+                        help="print digests as decimal integers")
+    args = parser.parse_args()
+
+    jobs = [(path, args.mode, args.verify) for path in args.files]
+    start = time.perf_counter()
+    if (args.jobs > 1) and (len(jobs) > 1) and ("-" not in args.files):
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            results = executor.map(_hash_path_job, jobs)
+            results = list(results)
+    else:
+        results = [_hash_path_job(job) for job in jobs]
+    wall_time = time.perf_counter() - start
+
+    status = 0
+    total_size = 0
+    for (result, error) in results:
+        if error is not None:
+            print("sha256sum: %s" % error, file=sys.stderr)
+            status = 1
+            continue
+
+        (path, digest, size, seconds, verified) = result
+        total_size += size
+        if args.int:
+            print("%d" % int(digest, 16))
+        else:
+            print("%s  %s" % (digest, path))
+        print("%s: %d bytes, %.3f MB/s" % (path, size, _mb_per_s(size, seconds)),
+              file=sys.stderr)
+        if verified is False:
+            print("sha256sum: %s: digest does not match hashlib" % path,
+                  file=sys.stderr)
+            status = 1
+
+    print("Total: %d files, %d bytes, %.3f MB/s" %
+          (len(jobs), total_size, _mb_per_s(total_size, wall_time)),
+          file=sys.stderr)
+    return status
+
+
+#-------------------------------------------------------------------
+# __name__
+# Python thingy which allows the file to be run standalone as
+# well as parsed from within a Python interpreter.
+#-------------------------------------------------------------------
+if __name__=="__main__":
+    # Run the main function.
+    sys.exit(main())
+
+#=======================================================================
+# EOF sha256sum.py
+#=======================================================================
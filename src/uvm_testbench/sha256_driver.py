@@ -1,12 +1,17 @@
 from pyuvm import uvm_analysis_port, uvm_driver
 from sha256_configdb import configdb
 from cocotb.triggers import RisingEdge, Timer
+from cocotb.utils import get_sim_time
+from sha256_timing import BLOCK_CYCLES, BLOCK_LATENCY
+from sha256_transaction import SHA256MessageTransaction
 
 class SHA256Driver(uvm_driver):
     def __init__(self, name, parent):
         super().__init__(name, parent)
         self.dut = None
         self.input_ap = uvm_analysis_port("input_ap", self)  # analysis port for inputs
+        self.pipelined = False
+        self.reset_throughput()
 
     def build_phase(self):
         super().build_phase()
@@ -25,6 +30,13 @@ class SHA256Driver(uvm_driver):
             
         else:
             self.logger.fatal("Failed to get DUT - no DUT available")
+
+        # Back-to-back throughput mode, off unless the test sets it
+        try:
+            self.pipelined = bool(configdb.get(self, "", "PIPELINED"))
+        except Exception:
+            self.pipelined = False
+        self.logger.info(f"Pipelined mode: {self.pipelined}")
     
     async def run_phase(self):
         self.raise_objection()
@@ -40,15 +52,31 @@ class SHA256Driver(uvm_driver):
         
         await RisingEdge(self.dut.clk)
         
+        # Measure the clock period to count cycles from the sim time
+        self.start_time = get_sim_time("ns")
+        await RisingEdge(self.dut.clk)
+        self.clock_period = get_sim_time("ns") - self.start_time
+        
         while True:
             txn = await self.seq_item_port.get_next_item()
             
             self.logger.info(f"Driving transaction: {txn}")
 
-            # Forward input transaction to scoreboard via analysis port
-            self.input_ap.write(txn)
+            # A message is driven as init with the first block and
+            # next with every following block
+            if isinstance(txn, SHA256MessageTransaction):
+                block_txns = txn.block_transactions()
+            else:
+                block_txns = [txn]
+
+            for block_txn in block_txns:
+                # Forward input transaction to scoreboard via analysis port
+                self.input_ap.write(block_txn)
 
-            await self.drive_transaction(txn)
+                if self.pipelined:
+                    await self.drive_pipelined(block_txn)
+                else:
+                    await self.drive_transaction(block_txn)
             
             self.seq_item_port.item_done()
         self.drop_objection()
@@ -89,6 +117,7 @@ class SHA256Driver(uvm_driver):
             
             # Wait one clock cycle for inputs to be registered
             await RisingEdge(self.dut.clk)
+            self.record_accept()
             
             # Deassert control signals (should be pulses)
             self.dut.init.value = 0
@@ -128,4 +157,89 @@ class SHA256Driver(uvm_driver):
             self.logger.error(f"Error in drive_transaction: {e}")
             import traceback
             self.logger.error(f"Traceback: {traceback.format_exc()}")
-            raise
\ No newline at end of file
+            raise
+
+    async def drive_pipelined(self, txn):
+        """Drive txn back to back with the previous block.
+
+        The block and pulse are presented in the cycle the core returns
+        to IDLE, so the edge after it samples them with ready high. The
+        pulse is held until an edge sees ready, so a slower core only
+        costs cycles, not blocks. Does not wait for the digest, the
+        monitor captures it.
+        """
+        if self.last_accept is not None:
+            for _ in range(self.last_accept + BLOCK_LATENCY - self.cycle()):
+                await RisingEdge(self.dut.clk)
+
+        self.dut.mode.value = txn.mode
+        self.dut.block.value = txn.block
+        self.dut.init.value = 1 if txn.init else 0
+        self.dut.next.value = 0 if txn.init else (1 if txn.next else 0)
+
+        timeout_count = 0
+        max_timeout = 1000
+        while True:
+            await RisingEdge(self.dut.clk)
+            if int(self.dut.ready.value) == 1:
+                break
+            timeout_count += 1
+            if timeout_count >= max_timeout:
+                self.logger.error("Timeout waiting for DUT to accept pipelined block")
+                self.dut.init.value = 0
+                self.dut.next.value = 0
+                return
+
+        self.dut.init.value = 0
+        self.dut.next.value = 0
+        self.record_accept()
+
+    def cycle(self):
+        """Rising edges since the driver started"""
+        return round((get_sim_time("ns") - self.start_time) / self.clock_period)
+
+    def record_accept(self):
+        """Called right after the edge that sampled init/next"""
+        self.last_accept = self.cycle()
+        if self.first_accept is None:
+            self.first_accept = self.last_accept
+        self.accepted_blocks += 1
+
+    def reset_throughput(self):
+        self.first_accept = None
+        self.last_accept = None
+        self.accepted_blocks = 0
+
+    async def report_throughput(self, name):
+        """Wait for the last block and report the sustained block rate.
+
+        The achieved rate is the cycles between the first and the last
+        sampled block, the theoretical rate is one block every
+        BLOCK_CYCLES, the core latency plus the cycle in IDLE.
+        Returns (achieved, theoretical) cycles per block.
+
+        Waits by cycle count, not on ready: right after the last
+        pipelined block is sampled, ready still reads its old value 1.
+        The digest of the last block is valid at edge
+        last_accept + BLOCK_LATENCY and seen by the monitor one edge later.
+        """
+        if self.last_accept is not None:
+            for _ in range(self.last_accept + BLOCK_LATENCY + 1 - self.cycle()):
+                await RisingEdge(self.dut.clk)
+
+        blocks = self.accepted_blocks
+        if blocks < 2:
+            self.logger.info(f"{name}: {blocks} block(s), no throughput to report")
+            self.reset_throughput()
+            return None
+
+        achieved = (self.last_accept - self.first_accept) / (blocks - 1)
+        theoretical = BLOCK_CYCLES
+        mode = "pipelined" if self.pipelined else "handshake"
+        self.logger.info(f"{name} ({mode}): {blocks} blocks, "
+                         f"{achieved:.1f} cycles/block ({512 / achieved:.2f} bits/cycle), "
+                         f"theoretical {theoretical} cycles/block "
+                         f"({512 / theoretical:.2f} bits/cycle), "
+                         f"{100 * theoretical / achieved:.1f}% of theoretical")
+        self.reset_throughput()
+        return (achieved, theoretical)
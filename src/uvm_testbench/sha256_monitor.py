@@ -3,6 +3,7 @@ from pyuvm import *
 from sha256_configdb import configdb
 from cocotb.triggers import RisingEdge
 from sha256_transaction import SHA256Transaction
+from sha256_timing import SHA256LatencyChecker
 
 # Import the global DUT handle
 try:
@@ -16,6 +17,7 @@ class SHA256Monitor(uvm_component):
         self.dut = None
         self.analysis_port = uvm_analysis_port("analysis_port", self)
         self.prev_digest_valid = 0
+        self.latency_checker = SHA256LatencyChecker()
 
     def build_phase(self):
         super().build_phase()
@@ -46,11 +48,13 @@ class SHA256Monitor(uvm_component):
         try:
             # Initialize previous state to track edges
             await RisingEdge(self.dut.clk)
+            self.check_timing()
             prev_digest_valid = int(self.dut.digest_valid.value)
             self.logger.info(f"Monitor started, initial digest_valid = {prev_digest_valid}")
             
             while True:
                 await RisingEdge(self.dut.clk)
+                self.check_timing()
                 
                 current_digest_valid = int(self.dut.digest_valid.value)
                 
@@ -77,6 +81,10 @@ class SHA256Monitor(uvm_component):
                 else:
                     self._prev_ready = int(self.dut.ready.value)
         
+        except AssertionError:
+            # Timing regression, fail the test
+            raise
+        
         except Exception as e:
             self.logger.error(f"Error in monitor run_phase: {e}")
             import traceback
@@ -85,4 +93,25 @@ class SHA256Monitor(uvm_component):
         finally:
             if hasattr(self, "_raised_objection") and self._raised_objection:
                 self.drop_objection()
-                self._raised_objection = False
\ No newline at end of file
+                self._raised_objection = False
+
+    def check_timing(self):
+        """Run the core timing model on the signals sampled at this edge.
+
+        The first mismatch fails the test, the model can not follow
+        the core after it anyway.
+        """
+        errors = self.latency_checker.sample(int(self.dut.reset_n.value),
+                                             int(self.dut.init.value),
+                                             int(self.dut.next.value),
+                                             int(self.dut.ready.value),
+                                             int(self.dut.digest_valid.value))
+        if errors:
+            self.logger.critical(f"Timing: {errors[0]}")
+            raise AssertionError(f"sha256_core timing mismatch: {errors[0]}")
+
+    def check_phase(self):
+        checker = self.latency_checker
+        assert not checker.errors, f"Timing check FAILED: {checker.errors[0]}"
+        self.logger.info(f"Timing check passed: {len(checker.latencies)} blocks, "
+                         f"{checker.expected_latency} cycles each")
@@ -1,7 +1,9 @@
 
+import random
 from pyuvm import *
+from sha256_configdb import configdb
 from sha256_env import SHA256Env
-from sha256_transaction import SHA256Transaction
+from sha256_transaction import SHA256Transaction, SHA256MessageTransaction
 
 class SHA256SimpleSequence(uvm_sequence):
     def __init__(self, name="SHA256SimpleSequence"):
@@ -82,11 +84,33 @@ class SHA256RandomSequence(uvm_sequence):
             await self.finish_item(txn)
     
 
+class SHA256MessageSequence(uvm_sequence):
+    def __init__(self, name="SHA256MessageSequence"):
+        super().__init__(name)
+    
+    async def body(self):
+        print("=== Starting SHA256 Message Sequence ===")
+        
+        # Padding boundaries, a nine block message as in
+        # sha256_issue_test and a long message, in both modes
+        lengths = [0, 55, 56, 64, 119, 541, 2000]
+        for (i, length) in enumerate(lengths * 2):
+            txn = SHA256MessageTransaction(f"message{i}")
+            txn.set_message(random.randbytes(length), i // len(lengths))
+            
+            print(f"--- Message {i+1}: {length} bytes, {len(txn.blocks)} blocks, mode {txn.mode} ---")
+            await self.start_item(txn)
+            await self.finish_item(txn)
+
 class SHA256Test(uvm_test):
+    # Drive blocks back to back instead of one handshake per block
+    pipelined = False
+
     def __init__(self, name, parent):
         super().__init__(name, parent)
     
     def build_phase(self):
+        configdb.set(self, "*", "PIPELINED", self.pipelined)
         self.env = SHA256Env("env", self)
     
     async def run_phase(self):
@@ -96,8 +120,14 @@ class SHA256Test(uvm_test):
         
         seq1 = SHA256SimpleSequence("simple_seq")
         seq2 = SHA256RandomSequence("random_seq")
+        seq3 = SHA256MessageSequence("message_seq")
+        driver = self.env.agent.driver
         await seq1.start(self.env.agent.sequencer)
+        await driver.report_throughput("simple_seq")
         await seq2.start(self.env.agent.sequencer)
+        await driver.report_throughput("random_seq")
+        await seq3.start(self.env.agent.sequencer)
+        await driver.report_throughput("message_seq")
         
         self.logger.info("=== SHA256 UVM Test Complete ===")
         
@@ -109,4 +139,9 @@ class SHA256Test(uvm_test):
         except:
             pass  # They might not have objections raised
         
-        self.drop_objection()
\ No newline at end of file
+        self.drop_objection()
+
+
+class SHA256ThroughputTest(SHA256Test):
+    """Same sequences with the driver in back-to-back mode"""
+    pipelined = True
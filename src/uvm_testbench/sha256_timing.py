@@ -0,0 +1,188 @@
+# sha256_timing.py - Cycle accurate timing model of the sha256_core control FSM
+#
+# SHA256CoreTiming mirrors sha256_ctrl_reg and t_ctr_reg of
+# src/rtl/sha256_core.v. Cycle c is the c-th rising clock edge; the
+# init/next values given for cycle c are the values sampled at that
+# edge, and ready/digest_valid are the values right after it.
+#
+#   IDLE   ready = 1. init or next -> ROUNDS, t_ctr = 0, digest_valid = 0
+#   ROUNDS t_ctr + 1 every cycle, t_ctr == 63 -> DONE
+#   DONE   digest updated, digest_valid = 1 -> IDLE
+#
+# A block sampled at edge c therefore gives ready and digest_valid
+# at edge c + BLOCK_LATENCY, and the next block can be sampled at
+# edge c + BLOCK_CYCLES at the earliest.
+#
+# SHA256LatencyChecker runs the model in lockstep with the signals
+# seen by the monitor and reports every cycle where ready or
+# digest_valid differ, and every block whose latency differs.
+
+SHA256_ROUNDS = 63
+
+CTRL_IDLE = 0
+CTRL_ROUNDS = 1
+CTRL_DONE = 2
+
+# Edges from the edge sampling init/next to the edge setting
+# digest_valid: 64 ROUNDS cycles and one DONE cycle.
+BLOCK_LATENCY = SHA256_ROUNDS + 2
+
+# Minimum edges between two sampled blocks.
+BLOCK_CYCLES = BLOCK_LATENCY + 1
+
+
+class SHA256CoreTiming:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Asynchronous reset (reset_n low)"""
+        self.ctrl = CTRL_IDLE
+        self.t_ctr = 0
+        self.digest_valid = 0
+
+    @property
+    def ready(self):
+        return int(self.ctrl == CTRL_IDLE)
+
+    def clock(self, init=0, next=0):
+        """One rising edge with the given sampled init/next values"""
+        if self.ctrl == CTRL_IDLE:
+            if init or next:
+                self.t_ctr = 0
+                self.digest_valid = 0
+                self.ctrl = CTRL_ROUNDS
+
+        elif self.ctrl == CTRL_ROUNDS:
+            if self.t_ctr == SHA256_ROUNDS:
+                self.ctrl = CTRL_DONE
+            self.t_ctr = (self.t_ctr + 1) & 0x3f
+
+        else:
+            self.digest_valid = 1
+            self.ctrl = CTRL_IDLE
+
+    def predict(self, pulses, cycles):
+        """Predict the ready/digest_valid changes from reset.
+
+        pulses maps a cycle to "init" or "next". Returns a list of
+        (cycle, signal, value) for every change right after an edge.
+        """
+        self.reset()
+        events = []
+        for cycle in range(cycles):
+            pulse = pulses.get(cycle)
+            prev = (self.ready, self.digest_valid)
+            self.clock(pulse == "init", pulse == "next")
+            if self.ready != prev[0]:
+                events.append((cycle, "ready", self.ready))
+            if self.digest_valid != prev[1]:
+                events.append((cycle, "digest_valid", self.digest_valid))
+        return events
+
+
+class SHA256LatencyChecker:
+    """Monitor side checker of the core timing.
+
+    Call sample() once per rising edge with the values seen at the
+    edge (the values before the registers update).
+    """
+    def __init__(self, expected_latency=BLOCK_LATENCY):
+        self.model = SHA256CoreTiming()
+        self.expected_latency = expected_latency
+        self.cycle = 0
+        self.start = None
+        self.prev_digest_valid = 0
+        self.latencies = []
+        self.errors = []
+
+    def sample(self, reset_n, init, next, ready, digest_valid):
+        """Returns the list of errors found at this edge"""
+        errors = []
+        if not reset_n:
+            self.model.reset()
+            self.start = None
+            self.prev_digest_valid = 0
+            self.cycle += 1
+            return errors
+
+        if ready != self.model.ready:
+            errors.append(f"cycle {self.cycle}: ready is {ready}, "
+                          f"timing model expects {self.model.ready}")
+        if digest_valid != self.model.digest_valid:
+            errors.append(f"cycle {self.cycle}: digest_valid is {digest_valid}, "
+                          f"timing model expects {self.model.digest_valid}")
+
+        # digest_valid seen high at this edge was set at the previous one.
+        if digest_valid and not self.prev_digest_valid and self.start is not None:
+            latency = self.cycle - 1 - self.start
+            self.latencies.append(latency)
+            if latency != self.expected_latency:
+                errors.append(f"cycle {self.cycle}: block sampled at cycle "
+                              f"{self.start} took {latency} cycles, expected "
+                              f"{self.expected_latency}")
+            self.start = None
+
+        if self.model.ready and (init or next):
+            self.start = self.cycle
+        self.model.clock(init, next)
+
+        self.prev_digest_valid = digest_valid
+        self.cycle += 1
+        self.errors += errors
+        return errors
+
+
+def timing_tests():
+    print("Running core timing model tests:")
+    errors = 0
+
+    # init at 0, next back to back as soon as ready, then a gap.
+    pulses = {0: "init", BLOCK_CYCLES: "next", 3 * BLOCK_CYCLES: "next"}
+    expected = [(0, "ready", 0),
+                (BLOCK_LATENCY, "ready", 1), (BLOCK_LATENCY, "digest_valid", 1),
+                (BLOCK_CYCLES, "ready", 0), (BLOCK_CYCLES, "digest_valid", 0),
+                (BLOCK_CYCLES + BLOCK_LATENCY, "ready", 1),
+                (BLOCK_CYCLES + BLOCK_LATENCY, "digest_valid", 1),
+                (3 * BLOCK_CYCLES, "ready", 0), (3 * BLOCK_CYCLES, "digest_valid", 0),
+                (3 * BLOCK_CYCLES + BLOCK_LATENCY, "ready", 1),
+                (3 * BLOCK_CYCLES + BLOCK_LATENCY, "digest_valid", 1)]
+    events = SHA256CoreTiming().predict(pulses, 4 * BLOCK_CYCLES)
+    if events != expected:
+        print(f"Error: predicted {events}")
+        errors += 1
+
+    # Run the checker against the model itself, and against a core
+    # with one extra round cycle.
+    class SlowCore(SHA256CoreTiming):
+        def clock(self, init=0, next=0):
+            if (self.ctrl == CTRL_ROUNDS) and (self.t_ctr == SHA256_ROUNDS):
+                if not getattr(self, "stalled", False):
+                    self.stalled = True
+                    return
+                self.stalled = False
+            super().clock(init, next)
+
+    for (core, ok) in [(SHA256CoreTiming(), True), (SlowCore(), False)]:
+        checker = SHA256LatencyChecker()
+        checker.sample(0, 0, 0, 1, 0)
+        for cycle in range(4 * BLOCK_CYCLES + 2):
+            pulse = pulses.get(cycle)
+            init = int(pulse == "init" and core.ready)
+            next = int(pulse == "next" and core.ready)
+            checker.sample(1, init, next, core.ready, core.digest_valid)
+            core.clock(init, next)
+        if ok and (checker.errors or checker.latencies != [BLOCK_LATENCY] * 3):
+            print(f"Error: checker reported {checker.errors}, latencies {checker.latencies}")
+            errors += 1
+        if not ok and not any("took 66 cycles" in e for e in checker.errors):
+            print(f"Error: checker missed the extra cycle: {checker.errors}")
+            errors += 1
+
+    if errors == 0:
+        print("Test case ok.")
+    print("")
+
+
+if __name__ == "__main__":
+    timing_tests()
@@ -1,5 +1,11 @@
 from pyuvm import uvm_sequence_item
 import random
+import itertools
+from sha256_codec import BLOCK_BYTES
+from sha256_padder import pad_blocks
+
+# Message ids for the scoreboard midstates
+_message_ids = itertools.count()
 
 class SHA256Transaction(uvm_sequence_item):
     def __init__(self, name="SHA256Transaction"):
@@ -11,6 +17,11 @@ class SHA256Transaction(uvm_sequence_item):
         self.mode = 0
         self.block = 0 
         
+        # Message this block belongs to, see SHA256MessageTransaction
+        self.message_id = None
+        self.block_index = 0
+        self.last = 1
+        
         # Optionally, outputs
         self.ready = 0
         self.digest = 0
@@ -22,4 +33,45 @@ class SHA256Transaction(uvm_sequence_item):
     
     def randomize(self):
         self.block = random.getrandbits(512)
-        self.mode = random.randint(0, 1)
\ No newline at end of file
+        self.mode = random.randint(0, 1)
+
+
+class SHA256MessageTransaction(uvm_sequence_item):
+    """A message of one or more padded blocks.
+
+    The driver issues init with the first block and next with the
+    others, as one SHA256Transaction per block.
+    """
+    def __init__(self, name="SHA256MessageTransaction"):
+        super().__init__(name)
+        self.message_id = next(_message_ids)
+        self.mode = 1
+        self.blocks = []
+
+    def __str__(self):
+        return (f"[SHA256MessageTransaction id={self.message_id} "
+                f"mode={self.mode} blocks={len(self.blocks)}]")
+
+    def set_message(self, message, mode=1):
+        """Pad message (bytes) into 512-bit blocks"""
+        self.mode = mode
+        self.blocks = list(pad_blocks(bytes(message), "int"))
+
+    def randomize(self, length=None):
+        if length is None:
+            length = random.randint(0, 16 * BLOCK_BYTES)
+        self.set_message(random.randbytes(length), random.randint(0, 1))
+
+    def block_transactions(self):
+        txns = []
+        for (index, block) in enumerate(self.blocks):
+            txn = SHA256Transaction(f"{self.get_name()}_block{index}")
+            txn.init = 1 if index == 0 else 0
+            txn.next = 0 if index == 0 else 1
+            txn.mode = self.mode
+            txn.block = block
+            txn.message_id = self.message_id
+            txn.block_index = index
+            txn.last = 1 if index == len(self.blocks) - 1 else 0
+            txns.append(txn)
+        return txns
@@ -3,14 +3,21 @@ from cocotb.triggers import Timer, RisingEdge
 from cocotb.clock import Clock
 from pyuvm import uvm_root
 from sha256_configdb import configdb
-from sha256_test import SHA256Test
+from sha256_test import SHA256Test, SHA256ThroughputTest
 
 @cocotb.test()
 async def sha256_uvm_test(dut):
     """Main cocotb test function with proper clock and reset"""
-    
+    await run_uvm_test(dut, "SHA256Test")
+
+@cocotb.test()
+async def sha256_uvm_throughput_test(dut):
+    """Same UVM test with the driver in back-to-back mode"""
+    await run_uvm_test(dut, "SHA256ThroughputTest")
+
+async def run_uvm_test(dut, test_name):
     print("=" * 60)
-    print("Starting SHA256 UVM Test")
+    print(f"Starting {test_name}")
     print("=" * 60)
     
     # Start the clock first
@@ -50,8 +57,8 @@ async def sha256_uvm_test(dut):
         print("It didn't save correctly to ConfigDB")
     
     # Run the UVM test
-    await uvm_root().run_test("SHA256Test")
+    await uvm_root().run_test(test_name)
     
     print("=" * 60)
-    print("SHA256 UVM Test Completed")
+    print(f"{test_name} Completed")
     print("=" * 60)
\ No newline at end of file